@@ -0,0 +1,341 @@
+"""HTTP API for pricing quotes and rendering their reports.
+
+A plain ASGI application, served for example with
+
+    uvicorn api:app --port 8000
+
+Endpoints:
+
+    GET  /health
+    GET  /roles                     role master and client types
+    GET  /fx                        exchange rates in use, rupees per unit
+    POST /quote                     price a quote definition, JSON in and out
+    POST /reports/internal          render the internal report PDF
+    POST /reports/client            render the client report PDF
+
+Request bodies are quote definitions in the format accepted by
+``reports.build_report_contexts``; report requests may add
+``generated_on`` and pass ``?backend=reportlab``. A definition without
+``fx_rate`` is priced at the current exchange rate, which is then echoed
+back in the quote and printed on the reports. Every response carries
+an ETag derived from the request content, and a request whose
+If-None-Match matches is answered with 304 before any pricing or
+rendering. PDFs render on a pool of worker processes (see
+``render_service``). Requests wait for a free slot, identical in-flight
+renders are shared, and rendered PDFs are cached by content.
+
+``asgi_request`` drives the app in-process, without a server:
+
+    status, headers, body = asyncio.run(asgi_request(app, "POST", "/quote", definition))
+"""
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from fx import BASE_CURRENCY, get_fx
+from money import split_milestones
+from pdf_cache import make_cache_key
+from pricing import CLIENT_TYPES, DEFAULT_OVERHEAD_FACTOR, TOTAL_FIELDS, fx_rate_for
+from rate_card import current_roles, get_rate_card
+from render_service import RenderQueueFull, RenderService
+from reports import REPORT_BACKENDS, REPORTS, build_report_contexts, definition_fx_rate, price_definition
+from shared_cache import SharedCache
+from startup import start_prewarm
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class BadRequest(Exception):
+    pass
+
+
+def validate_definition(definition) -> dict:
+    if not isinstance(definition, dict):
+        raise BadRequest("The request body must be a JSON object")
+    if definition.get("client_type", "IND") not in CLIENT_TYPES:
+        raise BadRequest(f"client_type must be one of {', '.join(CLIENT_TYPES)}")
+    if not 0 <= float(definition.get("margin_pct", 30)) < 100:
+        raise BadRequest("margin_pct must be at least 0 and below 100")
+    if not 0 <= float(definition.get("discount_pct", 0)) <= 100:
+        raise BadRequest("discount_pct must be between 0 and 100")
+    if not float(definition.get("overhead_factor", DEFAULT_OVERHEAD_FACTOR)) > 0:
+        raise BadRequest("overhead_factor must be positive")
+    if "fx_rate" in definition and not float(definition["fx_rate"]) > 0:
+        raise BadRequest("fx_rate must be positive")
+    roles = definition.get("roles", [])
+    if not isinstance(roles, list) or not all(isinstance(item, dict) for item in roles):
+        raise BadRequest("roles must be a list of {role, count, hours} objects")
+    milestones = definition.get("milestones") or []
+    if not isinstance(milestones, list) or not all(isinstance(m, dict) and "name" in m for m in milestones):
+        raise BadRequest("milestones must be a list of {name, desc, pct} objects")
+    for m in milestones:
+        if isinstance(m.get("pct"), bool) or not isinstance(m.get("pct"), (int, float)):
+            raise BadRequest("Every milestone needs a numeric pct")
+    for item in roles:
+        if item.get("role") and item["role"] not in current_roles():
+            raise BadRequest(f"Unknown role: {item['role']}")
+        if int(item.get("count", 0)) < 0 or int(item.get("hours", 0)) < 0:
+            raise BadRequest("count and hours cannot be negative")
+    return definition
+
+
+def quote_json(definition: dict) -> dict:
+    quote = price_definition(definition)
+    items = definition.get("roles", [])
+    milestones = definition.get("milestones") or []
+    return {
+        "client_type": definition.get("client_type", "IND"),
+        "currency_symbol": CLIENT_TYPES[definition.get("client_type", "IND")]["currency_symbol"],
+        "fx_rate": definition_fx_rate(definition),
+        "roles": [
+            {
+                "role": item.get("role") or "",
+                "count": int(item.get("count", 0)),
+                "hours": int(item.get("hours", 0)),
+                "compensation": float(quote.comp[idx]),
+                "emp_cost_per_hour": float(quote.emp[idx]),
+                "overhead_per_hour": float(quote.overhead[idx]),
+                "margin_per_hour": float(quote.margin[idx]),
+                "total_hours": int(quote.total_hours[idx]),
+                "internal_cost": float(quote.internal_cost[idx]),
+                "internal_cost_overhead": float(quote.final_amount[idx]),
+                "margin_amount": float(quote.margin_amount[idx]),
+            }
+            for idx, item in enumerate(items)
+        ],
+        "totals": {field: float(getattr(quote, field)) for field in TOTAL_FIELDS},
+        "milestones": [
+            {"name": m["name"], "pct": m["pct"], "amount": amount}
+            for m, amount in zip(milestones, split_milestones(quote.final_after_discount, [m["pct"] for m in milestones]))
+        ],
+    }
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class QuoteAPI:
+    """The ASGI application. The render pool is started on the first report request."""
+
+    def __init__(self, render_service: RenderService = None, pdf_cache: SharedCache = None, max_queued: int = 64):
+        self._render_service = render_service
+        # Requests have no session, so entries are only bounded by these limits
+        self.pdf_cache = pdf_cache or SharedCache(max_bytes=64 * 1024 * 1024, max_entries=64)
+        self.max_queued = max_queued
+        self._queued = 0
+        self._slots = None
+        self._inflight = {}
+
+    @classmethod
+    def from_env(cls):
+        return cls(max_queued=int(os.environ.get("API_MAX_QUEUED", 64)))
+
+    @property
+    def render_service(self) -> RenderService:
+        if self._render_service is None:
+            self._render_service = RenderService.from_env()
+        return self._render_service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        try:
+            body = await self._read_body(receive)
+            headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+            query = {name: values[-1] for name, values in parse_qs(scope["query_string"].decode()).items()}
+            status, response_headers, payload = await self._route(scope["method"], scope["path"], query, headers, body)
+        except BadRequest as e:
+            status, response_headers, payload = self._json(400, {"error": str(e)})
+        except RenderQueueFull as e:
+            status, response_headers, payload = self._json(503, {"error": str(e)})
+            response_headers.append(("retry-after", "5"))
+
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response_headers],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Imports pisa and compiles the templates without holding up startup
+                start_prewarm()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._render_service is not None:
+                    self._render_service.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise BadRequest(f"The request body is larger than {MAX_BODY_BYTES} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _json(status: int, data, headers: list = None):
+        return status, [("content-type", "application/json"), *(headers or [])], json.dumps(data).encode("utf-8")
+
+    @staticmethod
+    def _definition(body: bytes) -> dict:
+        try:
+            definition = json.loads(body or b"{}")
+        except ValueError as e:
+            raise BadRequest(f"Invalid JSON: {e}")
+        try:
+            definition = validate_definition(definition)
+        except (TypeError, ValueError, KeyError, AttributeError) as e:
+            raise BadRequest(f"Invalid quote definition: {e}")
+        # Pinned before hashing, so ETags and cached reports follow the rate
+        definition.setdefault("fx_rate", fx_rate_for(definition.get("client_type", "IND")))
+        return definition
+
+    async def _route(self, method: str, path: str, query: dict, headers: dict, body: bytes):
+        if method == "GET" and path == "/health":
+            return self._json(200, {"status": "ok"})
+        if method == "GET" and path == "/roles":
+            return self._json(200, {"roles": current_roles(), "client_types": CLIENT_TYPES})
+        if method == "GET" and path == "/fx":
+            fx = get_fx().rates()
+            return self._json(200, {"base": BASE_CURRENCY, "rates": fx.rates, "source": fx.source,
+                                    "fetched_at": datetime.fromtimestamp(fx.fetched_at).isoformat(timespec="seconds")})
+        if method == "POST" and path == "/quote":
+            return self._quote(headers, body)
+        if method == "POST" and path.startswith("/reports/") and path.removeprefix("/reports/") in REPORTS:
+            return await self._report(path.removeprefix("/reports/"), query, headers, body)
+        return self._json(404, {"error": f"No route for {method} {path}"})
+
+    def _quote(self, headers: dict, body: bytes):
+        definition = self._definition(body)
+        canonical = json.dumps(definition, sort_keys=True, ensure_ascii=False)
+        # The rates are part of the answer, so a rate-card change invalidates the tag
+        current_roles()
+        payload = f"quote\n{get_rate_card().digest}\n{canonical}"
+        etag = '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest() + '"'
+        cache_headers = [("etag", etag), ("cache-control", "no-cache")]
+        if etag_matches(headers.get("if-none-match"), etag):
+            return 304, cache_headers, b""
+        return self._json(200, quote_json(definition), cache_headers)
+
+    async def _report(self, kind: str, query: dict, headers: dict, body: bytes):
+        backend = query.get("backend", "pisa")
+        if backend not in REPORT_BACKENDS:
+            raise BadRequest(f"backend must be one of {', '.join(REPORT_BACKENDS)}")
+        definition = self._definition(body)
+        template_name, title = REPORTS[kind]
+        # Day-level default, so identical requests on the same day share a render
+        generated_on = definition.get("generated_on") or datetime.now().strftime("%d %b %Y")
+        contexts = dict(zip(("internal", "client"), build_report_contexts(definition, generated_on)))
+        context = contexts[kind]
+
+        key = make_cache_key(template_name, context, backend)
+        etag = f'"{key}"'
+        cache_headers = [("etag", etag), ("cache-control", "no-cache")]
+        if etag_matches(headers.get("if-none-match"), etag):
+            return 304, cache_headers, b""
+
+        pdf_bytes = await self._render(key, template_name, context, backend)
+        if pdf_bytes is None:
+            return self._json(500, {"error": "PDF generation failed"})
+        file_name = f"{definition.get('project_name', '')} {title}.pdf".strip()
+        return 200, [
+            ("content-type", "application/pdf"),
+            ("content-disposition", f'inline; filename="{file_name.encode("ascii", "replace").decode()}"'),
+            *cache_headers,
+        ], pdf_bytes
+
+    async def _render(self, key: str, template_name: str, context: dict, backend: str):
+        pdf_bytes = self.pdf_cache.get(key)
+        if pdf_bytes is not None:
+            return pdf_bytes
+
+        # Concurrent requests for the same report wait on one render
+        job = self._inflight.get(key)
+        if job is None:
+            if self._queued >= self.max_queued:
+                raise RenderQueueFull("Too many reports are waiting to be rendered, please retry shortly")
+            job = asyncio.ensure_future(self._render_job(key, template_name, context, backend))
+            self._inflight[key] = job
+            job.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(job)
+
+    async def _render_job(self, key: str, template_name: str, context: dict, backend: str):
+        # Jobs wait here for a pool slot instead of overflowing the render service
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.render_service.max_pending)
+        self._queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+        try:
+            future = self.render_service.submit(template_name, context, backend=backend)
+            pdf_bytes, _ = await asyncio.wrap_future(future)
+        finally:
+            self._slots.release()
+        if pdf_bytes is not None:
+            self.pdf_cache.put(key, pdf_bytes)
+        return pdf_bytes
+
+
+app = QuoteAPI.from_env()
+
+
+async def asgi_request(asgi_app, method: str, path: str, body=None, headers: dict = None):
+    """Send one request to an ASGI app in-process and return (status, headers, body).
+
+    ``body`` may be bytes or any JSON-serialisable value.
+    """
+    path, _, query_string = path.partition("?")
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "path": path,
+        "query_string": query_string.encode(),
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()],
+    }
+    request_sent = False
+    response = {"headers": {}, "body": b""}
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            return {"type": "http.disconnect"}
+        request_sent = True
+        return {"type": "http.request", "body": body or b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {name.decode("latin-1"): value.decode("latin-1") for name, value in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await asgi_app(scope, receive, send)
+    return response["status"], response["headers"], response["body"]
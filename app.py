@@ -1,27 +1,42 @@
-import base64
+import hashlib
 import textwrap
 import time
 import streamlit as st
-from io import BytesIO
-from xhtml2pdf import pisa
 import os
+from collections import Counter
 from datetime import datetime
-import math
-from jinja2 import Environment, FileSystemLoader
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-import io
+from functools import partial
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from pdf_attach import append_pdfs, attachment_cache_key, is_pdf, pdf_readable
+from pdf_cache import make_cache_key
+from perf import PerfRecorder, StageTimer
+from render_service import RenderQueueFull, RenderService
+from reports import CLIENT_TEMPLATE, INTERNAL_TEMPLATE, build_report_contexts, render_report, warm_templates
+from fx import BASE_CURRENCY, get_fx
+from money import split_milestones
+from pricing import CLIENT_TYPES, DEFAULT_MARGIN_PCT, DEFAULT_OVERHEAD_FACTOR, MARGIN_OPTIONS, fx_rate_for, price_grid
+from quote_model import QuoteModel
+from quote_store import QuoteStore
+from rate_card import current_roles, get_rate_card
+from shared_cache import SharedCache
+from solver import RoleBounds, solve
+from startup import start_prewarm, startup_report, timed_import
+from upload_store import UploadStore, UploadTooLarge
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-USD_INR_RATE = 91.01
+# Compact table column -> team row field
+TEAM_TABLE_COLUMNS = {"Role": "role", "Count": "count", "Hours": "hours"}
+TEAM_ROW_DEFAULTS = {"role": "", "count": 0, "hours": 0}
+
+# Parameter grid of the scenario matrix
+SCENARIO_OVERHEADS = [round(1 + step / 10, 1) for step in range(11)]
+SCENARIO_DISCOUNTS = list(range(0, 101, 5))
+# "pisa" renders the HTML templates, "reportlab" draws the same reports directly
+REPORT_BACKEND = os.environ.get("REPORT_BACKEND", "pisa")
 
-template_env = Environment(
-    loader=FileSystemLoader(os.path.join(os.getcwd(), "templates"))
-)
-internal_template = template_env.get_template("internal_report.html")
-client_template = template_env.get_template("client_report.html")
 
+timer = StageTimer()
 
 logo_path = os.path.join(BASE_DIR, "templates", "ormae_logo.png")
 generated_on = datetime.now().strftime("%d %b %Y, %I:%M %p")
@@ -49,20 +64,344 @@ def add_milestone():
     )
 
 
-# Download PDF button
-def generate_pdf_from_html(template_html: str):
-    pdf_buffer = BytesIO()
-    pisa_status = pisa.CreatePDF(
-        src=template_html,
-        dest=pdf_buffer,
-        encoding="UTF-8"
+@st.cache_resource
+def get_shared_cache():
+    # Rendered PDFs and pricing grids of every session of this server process,
+    # within the CACHE_MAX_MB, SESSION_CACHE_MAX_MB and SESSION_IDLE_MINUTES limits
+    return SharedCache.from_env()
+
+
+@st.cache_resource
+def get_template_registry():
+    # Built once per server process instead of on every rerun of every session
+    return warm_templates()
+
+
+@st.cache_resource
+def get_render_service():
+    # Worker count and queue depth come from RENDER_* environment variables
+    return RenderService.from_env()
+
+
+@st.cache_resource
+def get_perf_recorder():
+    # Rolling stage timings of all sessions, exported per PERF_* environment variables
+    return PerfRecorder.from_env()
+
+
+@st.cache_resource
+def get_quote_store():
+    # Database path comes from QUOTE_DB_PATH
+    return QuoteStore.from_env()
+
+
+@st.cache_resource
+def get_upload_store():
+    # Location, size limits and TTL come from UPLOAD_* environment variables
+    return UploadStore.from_env()
+
+
+def document_upload(label: str, kind: str):
+    # The file is spooled to the upload store and dropped from the uploader
+    # straight away, so only its name, size and hash stay in session state.
+    st.markdown(f"**{label}**")
+    col, spacer = st.columns([3, 4])
+
+    with col:
+        doc = st.session_state[kind]
+        if doc:
+            st.markdown(f"📄 {doc['name']} ({doc['size'] / 1024:,.0f} KB)")
+            if not doc.get("readable", True):
+                st.warning("⚠️ This file cannot be read as a PDF, so it will not be appended to the reports")
+            if st.button("Remove", key=f"remove_{kind}"):
+                st.session_state[kind] = None
+                st.rerun()
+            return
+
+        version = st.session_state.get(f"{kind}_uploader_version", 0)
+        uploaded = st.file_uploader(
+            label,
+            type=["pdf", "doc", "docx"],
+            key=f"{kind}_uploader_{version}",
+            label_visibility="collapsed"
+        )
+        if uploaded:
+            # A new uploader key releases the file held by this one
+            st.session_state[f"{kind}_uploader_version"] = version + 1
+            store = get_upload_store()
+            try:
+                doc = store.put(uploaded, uploaded.name)
+            except UploadTooLarge as e:
+                st.error(f"❌ {e}")
+            else:
+                if doc["name"].lower().endswith(".pdf"):
+                    # Checked once here, so a broken file never fails a download
+                    doc["readable"] = pdf_readable(store.path(doc["sha256"]))
+                st.session_state[kind] = doc
+                st.rerun()
+
+
+def report_key(template_name: str, context: dict) -> str:
+    # The timestamp printed on a report changes every minute but is not a quote
+    # input, so a later rerun still finds the PDFs rendered for the same quote
+    return make_cache_key(
+        template_name, {name: value for name, value in context.items() if name != "generated_on"}, REPORT_BACKEND
     )
 
-    if pisa_status.err:
-        return None
 
-    pdf_buffer.seek(0)
-    return pdf_buffer
+def store_pdf(shared_cache, recorder, key, kind, submitted, session_id, future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    pdf_bytes, timings = future.result()
+    recorder.add(f"render_html_{kind}", timings["render_html"] * 1000)
+    recorder.add(f"pdf_{kind}", timings["layout"] * 1000, len(pdf_bytes) if pdf_bytes else None)
+    recorder.add(f"pdf_job_{kind}", (time.perf_counter() - submitted) * 1000)
+    if pdf_bytes is not None:
+        shared_cache.put(key, pdf_bytes, session=session_id)
+
+
+def job_failed(future) -> bool:
+    return future.exception() is not None or future.result()[0] is None
+
+
+def submit_reports(reports: dict):
+    # Internal and client reports render in parallel on the worker pool
+    shared_cache = get_shared_cache()
+    recorder = get_perf_recorder()
+    service = get_render_service()
+    session_id = get_script_run_ctx().session_id
+    jobs = {}
+    for kind, report in reports.items():
+        if report["key"] in shared_cache:
+            continue
+        future = service.submit(report["template"], report["context"], session_id, REPORT_BACKEND)
+        future.add_done_callback(
+            partial(store_pdf, shared_cache, recorder, report["key"], kind, time.perf_counter(), session_id)
+        )
+        jobs[kind] = (report["key"], future)
+    st.session_state.report_jobs = jobs
+
+
+@st.fragment(run_every=0.5)
+def report_progress(jobs: dict):
+    done = sum(future.done() for _, future in jobs.values())
+    st.progress(done / len(jobs), text=f"⏳ Rendering reports ({done}/{len(jobs)})…")
+    if done == len(jobs):
+        st.rerun()
+
+
+def widget_team_rows() -> list:
+    return [
+        {
+            "role": st.session_state.get(f"role_{i}") or "",
+            "count": st.session_state.get(f"count_{i}", 0),
+            "hours": st.session_state.get(f"hours_{i}", 0)
+        }
+        for i in range(len(st.session_state.rows))
+    ]
+
+
+def team_rows() -> list:
+    # Role, count and hours of every Team Structure row, from whichever editor is shown
+    if st.session_state.get("compact_grid"):
+        return st.session_state.team_table_rows
+    return widget_team_rows()
+
+
+def switch_grid_mode():
+    # Carries the rows over between the per-row widgets and the compact table
+    if st.session_state.compact_grid:
+        st.session_state.team_table_rows = widget_team_rows()
+        st.session_state.team_table_version = st.session_state.get("team_table_version", 0) + 1
+        return
+
+    set_widget_rows(st.session_state.team_table_rows)
+
+
+def set_widget_rows(rows: list):
+    st.session_state.rows = list(range(len(rows)))
+    seen = set()
+    for i, row in enumerate(rows):
+        # A role selectbox only offers roles no other row has picked
+        role = "" if row["role"] in seen else row["role"]
+        seen.add(role or None)
+        st.session_state[f"role_{i}"] = role
+        st.session_state[f"count_{i}"] = row["count"]
+        st.session_state[f"hours_{i}"] = row["hours"]
+
+
+def set_team_rows(rows: list):
+    # Replaces the whole team, in the per-row widgets and the compact table
+    set_widget_rows(rows)
+    st.session_state.team_table_rows = [dict(row) for row in rows]
+    st.session_state.team_table_version = st.session_state.get("team_table_version", 0) + 1
+
+
+def load_quote(quote_id: int):
+    # Restores every input of a saved quote in one step, before the page reruns
+    definition = get_quote_store().load(quote_id)["definition"]
+    st.session_state.project_name = definition["project_name"]
+    st.session_state.project_description = definition.get("project_description", "")
+    st.session_state.client_type = definition["client_type"]
+    st.session_state.overhead_factor = float(definition["overhead_factor"])
+    st.session_state.margin_pct = int(definition["margin_pct"])
+    st.session_state.discount_pct = int(definition["discount_pct"])
+
+    rows = [{**TEAM_ROW_DEFAULTS, **row, "role": row.get("role") or ""} for row in definition["roles"]]
+    set_team_rows(rows)
+
+    milestones = definition.get("milestones") or []
+    st.session_state.show_milestone = bool(milestones)
+    st.session_state.milestones = [dict(m) for m in milestones] or [{"name": "Milestone 1", "desc": "", "pct": 0.0}]
+    for i, m in enumerate(st.session_state.milestones):
+        # Milestone names are seeded from the milestone itself
+        st.session_state.pop(f"ms_name_{i}", None)
+        st.session_state[f"ms_desc_{i}"] = m.get("desc", "")
+        st.session_state[f"ms_pct_{i}"] = int(m["pct"])
+
+    st.session_state.user_doc = definition.get("user_doc")
+    st.session_state.functional_doc = definition.get("functional_doc")
+
+
+def apply_solution(candidate):
+    # Puts a solver candidate's team, margin and discount into the calculator
+    st.session_state.margin_pct = candidate.margin_pct
+    st.session_state.discount_pct = candidate.discount_pct
+    set_team_rows([dict(row) for row in candidate.roles] or [dict(TEAM_ROW_DEFAULTS)])
+
+
+def apply_team_table_edits():
+    # Folds the table edits into team_table_rows and starts a fresh editor,
+    # so the computed columns it shows next are priced from the new inputs
+    edits = st.session_state[f"team_table_{st.session_state.team_table_version}"]
+    rows = [dict(row) for row in st.session_state.team_table_rows]
+
+    def row_values(changes: dict) -> dict:
+        return {
+            TEAM_TABLE_COLUMNS[column]: value if value is not None else TEAM_ROW_DEFAULTS[TEAM_TABLE_COLUMNS[column]]
+            for column, value in changes.items()
+            if column in TEAM_TABLE_COLUMNS
+        }
+
+    for idx, changes in edits["edited_rows"].items():
+        rows[int(idx)].update(row_values(changes))
+    for added in edits["added_rows"]:
+        rows.append({**TEAM_ROW_DEFAULTS, **row_values(added)})
+    for idx in sorted(edits["deleted_rows"], reverse=True):
+        rows.pop(idx)
+    for row in rows:
+        row["count"], row["hours"] = int(row["count"]), int(row["hours"])
+    st.session_state.team_table_version += 1
+
+    # A role can only be on the team once, as in the per-row widgets
+    roles = [row["role"] for row in rows if row["role"]]
+    duplicates = sorted({role for role in roles if roles.count(role) > 1})
+    if duplicates:
+        st.session_state.team_table_warning = f"⚠️ Each role can only be added once: {', '.join(duplicates)}"
+        return
+    st.session_state.team_table_rows = rows
+
+
+def priced_cells(quote, idx: int, currency_symbol: str) -> list:
+    return [
+        f"{currency_symbol}{quote.comp[idx]:,.0f}",
+        f"{currency_symbol}{quote.emp[idx]:,.0f}",
+        f"{currency_symbol}{quote.overhead[idx]:,.0f}",
+        f"{currency_symbol}{quote.margin[idx]:,.0f}",
+        f"{quote.total_hours[idx]:,}",
+        f"{currency_symbol}{quote.internal_cost[idx]:,.0f}",
+        f"{currency_symbol}{quote.final_amount[idx]:,.0f}",
+        f"{currency_symbol}{quote.margin_amount[idx]:,.0f}",
+    ]
+
+
+def team_table(computed_headers: list, quote, currency_symbol: str, role_master: dict):
+    # One data editor for the whole team instead of 12 elements per row
+    rows = st.session_state.team_table_rows
+    if warning := st.session_state.pop("team_table_warning", None):
+        st.warning(warning)
+    frame = pd.DataFrame(
+        [
+            {
+                "Role": row["role"] or None,
+                "Count": row["count"],
+                "Hours": row["hours"],
+                **dict(zip(computed_headers, priced_cells(quote, idx, currency_symbol)))
+            }
+            for idx, row in enumerate(rows)
+        ],
+        columns=["Role", "Count", "Hours", *computed_headers]
+    ).astype({"Count": "int64", "Hours": "int64"})
+
+    st.data_editor(
+        frame,
+        column_config={
+            "Role": st.column_config.SelectboxColumn("Role", options=list(role_master), width="medium"),
+            "Count": st.column_config.NumberColumn("Count", min_value=0, step=1, default=0),
+            "Hours": st.column_config.NumberColumn("Hours", min_value=0, step=1, default=0),
+        },
+        disabled=computed_headers,
+        num_rows="dynamic",
+        hide_index=True,
+        key=f"team_table_{st.session_state.team_table_version}",
+        on_change=apply_team_table_edits
+    )
+
+
+def fragment_timer() -> StageTimer:
+    # A fragment-only rerun skips the rest of the script, including its timer,
+    # so the fragment is timed on its own and recorded by finish_fragment.
+    if get_script_run_ctx().fragment_ids_this_run:
+        return StageTimer()
+    return timer
+
+
+def finish_fragment(name: str, section_timer: StageTimer, signature):
+    # A fragment rerun only redraws its own section. When it changed something
+    # another section shows (the signature), the whole page is rerun instead.
+    if section_timer is not timer:
+        get_perf_recorder().add_timer(section_timer, total_stage=f"fragment_{name}")
+    previous = st.session_state.get(f"{name}_signature")
+    st.session_state[f"{name}_signature"] = signature
+    if previous != signature and get_script_run_ctx().fragment_ids_this_run:
+        st.rerun()
+
+
+def deferred_pdf(template_name: str, context: dict, attachments: list = ()):
+    # Returns a callable for st.download_button that serves the PDF rendered
+    # by the worker pool, re-rendering only if it was evicted meanwhile, with
+    # the uploaded PDFs in ``attachments`` appended. The caches and session are
+    # resolved here because the callable runs outside the script thread.
+    shared_cache = get_shared_cache()
+    session_id = get_script_run_ctx().session_id
+    upload_store = get_upload_store()
+    get_template_registry()
+
+    def build():
+        pdf_bytes = shared_cache.get_or_compute(
+            report_key(template_name, context),
+            lambda: render_report(template_name, context, REPORT_BACKEND),
+            session_id
+        )
+        if pdf_bytes is None:
+            raise RuntimeError(f"PDF generation failed for {template_name}")
+
+        # Documents that expired from the upload store are left out
+        stored = [(a, upload_store.path(a["sha256"])) for a in attachments]
+        stored = [(a, path) for a, path in stored if path is not None]
+        if not stored:
+            return pdf_bytes
+        key = attachment_cache_key(report_key(template_name, context), [a for a, _ in stored])
+        try:
+            return shared_cache.get_or_compute(
+                key, lambda: append_pdfs(pdf_bytes, [path for _, path in stored]), session_id
+            )
+        except Exception:
+            # A document that passed the upload check but still cannot be
+            # merged leaves the report without attachments, not undownloadable
+            return pdf_bytes
+
+    return build
 
 
 # ------------------ PAGE CONFIG ------------------
@@ -98,6 +437,16 @@ st.markdown("""
 .breakdown div {
     text-align: center;
 }
+button[kind="secondary"] {
+    margin: 0 !important;
+    padding: 0px !important;
+    background: transparent !important;
+    border: none !important;
+    font-size: 15px !important;
+}
+button[kind="secondary"]:hover {
+    transform: scale(1.2);
+}
 .estimate-text {
     margin-top: 1.8rem;
     font-size: 16px;
@@ -129,44 +478,44 @@ p2.markdown(
     unsafe_allow_html=True
 )
 
-project_name = p1.text_input("Project Name", label_visibility="collapsed")
+project_name = p1.text_input("Project Name", key="project_name", label_visibility="collapsed")
 client_type = p2.selectbox(
     "Client Type",
-    ["IND", "USA"],
+    list(CLIENT_TYPES),
+    key="client_type",
     label_visibility="collapsed"
 )
 
-currency_symbol = "₹" if client_type == "IND" else "$"
-if client_type == "IND":
-    margin_divisor = 0.7
-    conversion_rate = 1
-else:
-    margin_divisor = 0.5
-    conversion_rate = 1 / USD_INR_RATE
-
-project_description = st.text_area("Project Description", height=100)
-
-# ================== ROLE MASTER ==================
-ROLES = {
-    "Data Engineer": {"comp": 1200000},
-    "Senior Data Engineer": {"comp": 2000000},
-    "Lead Data Engineer": {"comp": 2600000},
-    "Software Developer": {"comp": 1200000},
-    "Senior Software Developer": {"comp": 2000000},
-    "Lead Software Developer": {"comp": 2600000},
-    "Frontend Developer": {"comp": 1200000},
-    "Senior Frontend Developer": {"comp": 2000000},
-    "Lead Frontend Developer": {"comp": 2600000},
-    "DevOps Engineer": {"comp": 2000000},
-    "Data Scientist": {"comp": 1200000},
-    "OR Scientist": {"comp": 1200000},
-    "Project Manager": {"comp": 2600000}
-}
+currency_symbol = CLIENT_TYPES[client_type]["currency_symbol"]
+
+project_description = st.text_area("Project Description", height=100, key="project_description")
+
+timer.lap("page_setup")
 
 # ================== SESSION STATE ==================
+# Keeps this session's cached PDFs and grids from being released as idle
+get_shared_cache().touch(get_script_run_ctx().session_id)
+
 if "rows" not in st.session_state:
     st.session_state.rows = [0]
 
+if "quote_model" not in st.session_state:
+    st.session_state.quote_model = QuoteModel()
+
+if "overhead_factor" not in st.session_state:
+    st.session_state.overhead_factor = DEFAULT_OVERHEAD_FACTOR
+
+if "margin_pct" not in st.session_state:
+    st.session_state.margin_pct = DEFAULT_MARGIN_PCT
+
+if "show_milestone" not in st.session_state:
+    st.session_state.show_milestone = False
+
+if "milestones" not in st.session_state:
+    st.session_state.milestones = [
+        {"name": "Milestone 1", "desc": "", "pct": 0.0}
+    ]
+
 # ================== QUOTATION CARD ==================
 st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
 
@@ -180,404 +529,587 @@ with controls:
             "Overhead Factor",
             min_value=1.0,
             max_value=2.0,
-            value=1.4,
             step=0.1,
-            format="%.1f"
+            format="%.1f",
+            key="overhead_factor"
         )
 
     with c2:
         margin_factor_pct = st.selectbox(
             "Margin %",
-            options=[10, 20, 30, 40, 50],
-            index=2
+            options=list(MARGIN_OPTIONS),
+            key="margin_pct"
         )
 
-margin_factor = 1 - margin_factor_pct / 100
-
 st.markdown(
     "<h1 style='text-align:left; font-size:30px;'> 🧮 Team Structure</h1>",
     unsafe_allow_html=True
 )
 
 
-# =========================== ROLES ====================================
-
-headers = [
-    "Role <span style='color:red;'>*</span>",
-    "Count <span style='color:red;'>*</span>",
-    "Hours <span style='color:red;'>*</span>",
-    "Compensation",
-    "Emp Cost / Hr",
-    "Overhead / Hr",
-    "Margin / Hr",
-    "Total Hours",
-    "Internal Cost",
-    "Internal Cost + Overhead",
-    "Margin"
-]
-
-cols = st.columns([2, 1, 0.8, 1, 1, 1, 1, 1, 1, 1, 1, 0.4])
+@st.fragment
+def team_structure(overhead_factor, margin_factor_pct, client_type, currency_symbol):
+    section_timer = fragment_timer()
 
-for col, header in zip(cols, headers):
-    col.markdown(f"**{header}**", unsafe_allow_html=True)
+    # =========================== ROLES ====================================
 
-total_internal = 0
-total_final = 0
-total_margin = 0
-total_duration = 0
-total_resource = 0
-remove_rows = []
+    # Follows edits to the rate-card file without a restart
+    role_master = current_roles()
+    # Cached; a stale rate is served while a fresh one is fetched in the background
+    fx_rate = fx_rate_for(client_type)
 
-for idx in range(len(st.session_state.rows)):
-    c = st.columns([2, 1, 0.8, 1, 1, 1, 1, 1, 1, 1, 1, 0.4])
+    compact_grid = st.toggle(
+        "Compact table",
+        key="compact_grid",
+        on_change=switch_grid_mode,
+        help="Edit all roles in one table, faster for large teams"
+    )
 
-    selected_roles = [
-        st.session_state.get(f"role_{i}")
-        for i in range(len(st.session_state.rows))
-        if i != idx
+    headers = [
+        "Role <span style='color:red;'>*</span>",
+        "Count <span style='color:red;'>*</span>",
+        "Hours <span style='color:red;'>*</span>",
+        "Compensation",
+        "Emp Cost / Hr",
+        "Overhead / Hr",
+        "Margin / Hr",
+        "Total Hours",
+        "Internal Cost",
+        "Internal Cost + Overhead",
+        "Margin"
     ]
-    available_roles = [""] + [r for r in ROLES if r not in selected_roles]
 
-    role = c[0].selectbox("Role", available_roles, key=f"role_{idx}", label_visibility="collapsed")
-    count = c[1].number_input("Count", min_value=0, step=1, key=f"count_{idx}", label_visibility="collapsed")
-    hours = c[2].number_input("Hours", min_value=0, step=1, key=f"hours_{idx}", label_visibility="collapsed")
-
-    if role:
-        comp = ROLES[role]["comp"] * conversion_rate
+    row_cells = []
+    if compact_grid:
+        # Drawn once the rows have been priced
+        table_slot = st.container()
     else:
-        comp = emp = overhead = 0
-
-    emp = comp / 2080
-    overhead = emp * overhead_factor
-    margin = overhead / margin_divisor
-    total_hours = count * hours
-    internal_cost = total_hours * emp
-    final_amount = total_hours * overhead
-    margin_amount = final_amount / margin_factor
-
-    c[3].text(f"{currency_symbol}{comp:,.0f}")
-    c[4].text(f"{currency_symbol}{emp:,.0f}")
-    c[5].text(f"{currency_symbol}{overhead:,.0f}")
-    c[6].text(f"{currency_symbol}{margin:,.0f}")
-    c[7].text(f"{total_hours:,}")
-    c[8].text(f"{currency_symbol}{internal_cost:,.0f}")
-    c[9].text(f"{currency_symbol}{final_amount:,.0f}")
-    c[10].text(f"{currency_symbol}{margin_amount:,.0f}")
-
-    with c[11]:
-        st.markdown("""
-        <style>
-        button[kind="secondary"] {
-            margin: 0 !important;
-            padding: 0px !important;
-            background: transparent !important;
-            border: none !important;
-            font-size: 15px !important;
-        }
+        cols = st.columns([2, 1, 0.8, 1, 1, 1, 1, 1, 1, 1, 1, 0.4])
 
-        button[kind="secondary"]:hover {
-            transform: scale(1.2);
-        }
-        </style>
-        """, unsafe_allow_html=True)
-        if st.button("🗑️", key=f"remove_{idx}"):
-            remove_rows.append(idx)
+        for col, header in zip(cols, headers):
+            col.markdown(f"**{header}**", unsafe_allow_html=True)
+
+        remove_rows = []
+
+        # Roles picked in any row, counted once instead of rescanning every row per row
+        selected_role_counts = Counter(
+            st.session_state.get(f"role_{i}")
+            for i in range(len(st.session_state.rows))
+        )
 
-    total_internal += internal_cost
-    total_final += final_amount
-    total_margin += margin_amount
-    total_duration += total_hours
-    total_resource += count
+        for idx in range(len(st.session_state.rows)):
+            c = st.columns([2, 1, 0.8, 1, 1, 1, 1, 1, 1, 1, 1, 0.4])
 
-if remove_rows:
-    for r in sorted(remove_rows, reverse=True):
-        st.session_state.rows.pop(r)
-    st.rerun()
+            own_role = st.session_state.get(f"role_{idx}")
+            available_roles = [""] + [r for r in role_master if selected_role_counts[r] - (r == own_role) <= 0]
+
+            c[0].selectbox("Role", available_roles, key=f"role_{idx}", label_visibility="collapsed")
+            c[1].number_input("Count", min_value=0, step=1, key=f"count_{idx}", label_visibility="collapsed")
+            c[2].number_input("Hours", min_value=0, step=1, key=f"hours_{idx}", label_visibility="collapsed")
+
+            with c[11]:
+                if st.button("🗑️", key=f"remove_{idx}"):
+                    remove_rows.append(idx)
+
+            # Computed cells are filled in once the whole grid has been priced
+            row_cells.append(c[3:11])
+
+        if remove_rows:
+            for r in sorted(remove_rows, reverse=True):
+                st.session_state.rows.pop(r)
+            st.rerun()
 
-# Get list of roles already selected
-selected_roles = [st.session_state.get(f"role_{i}") for i in range(len(st.session_state.rows))]
-available_roles = [r for r in ROLES if r not in selected_roles]
+        # Get list of roles already selected
+        selected_roles = [st.session_state.get(f"role_{i}") for i in range(len(st.session_state.rows))]
+        available_roles = [r for r in role_master if r not in selected_roles]
 
-# Disable Add Role button if no roles left
-disable_add_role = len(available_roles) == 0
+        # Disable Add Role button if no roles left
+        disable_add_role = len(available_roles) == 0
 
-st.button("➕ Add Role", on_click=lambda: st.session_state.rows.append(len(st.session_state.rows)),
-          disabled=disable_add_role)
+        st.button("➕ Add Role", on_click=lambda: st.session_state.rows.append(len(st.session_state.rows)),
+                  disabled=disable_add_role)
 
+    section_timer.lap("team_structure")
 
-# =========================== DISCOUNT ===========================
+    # =========================== DISCOUNT ===========================
 
-disc_col, spacer = st.columns([1, 11])
+    disc_col, spacer = st.columns([1, 11])
 
-with disc_col:
-    discount_pct = st.number_input(
-        "Discount %",
-        min_value=0,
-        max_value=100,
-        step=5,
+    with disc_col:
+        discount_pct = st.number_input(
+            "Discount %",
+            min_value=0,
+            max_value=100,
+            step=5,
+            key="discount_pct"
+        )
+
+    # Only rows whose inputs changed since the last rerun are re-priced
+    rows = team_rows()
+    retired_roles = sorted({row["role"] for row in rows if row["role"] and row["role"] not in role_master})
+    if retired_roles:
+        st.warning(f"⚠️ No longer in the rate card, priced at zero: {', '.join(retired_roles)}")
+    row_roles = [row["role"] if row["role"] in role_master else "" for row in rows]
+    row_counts = [row["count"] for row in rows]
+    row_hours = [row["hours"] for row in rows]
+    quote = st.session_state.quote_model.update(
+        row_roles,
+        row_counts,
+        row_hours,
+        overhead_factor=overhead_factor,
+        margin_pct=margin_factor_pct,
+        discount_pct=discount_pct,
+        client_type=client_type,
+        role_master=role_master,
+        fx_rate=fx_rate
     )
 
-discount_amount = total_margin * discount_pct / 100
-final_after_discount = total_margin - discount_amount
+    if compact_grid:
+        with table_slot:
+            team_table(headers[3:], quote, currency_symbol, role_master)
+
+    for idx, cells in enumerate(row_cells):
+        for cell, value in zip(cells, priced_cells(quote, idx, currency_symbol)):
+            cell.text(value)
+
+    total_internal = quote.total_internal
+    total_final = quote.total_final
+    total_margin = quote.total_margin
+    total_duration = quote.total_duration
+    total_resource = quote.total_resource
+    discount_amount = quote.discount_amount
+    final_after_discount = quote.final_after_discount
+
+    section_timer.lap("pricing")
+
+    # =============================== TOTAL AMOUNT TABLE =====================================
+    st.markdown(
+        f"""
+        <table style="
+            width:40%;
+            border-collapse:collapse;
+            margin-top:14px;
+            font-size:16px;
+        ">
+            <tr>
+                <td style="padding:6px 8px; font-weight:600;">Total Resource Count</td>
+                <td style="padding:6px 8px; text-align:right;">
+                    {total_resource:,.0f}
+                </td>
+            </tr>
+            <tr>
+                <td style="padding:6px 8px; font-weight:600;">Total Project Duration</td>
+                <td style="padding:6px 8px; text-align:right;">
+                    {total_duration:,.0f} Hrs
+                </td>
+            </tr>
+            <tr>
+                <td style="padding:6px 8px; font-weight:600;">Total Internal Cost</td>
+                <td style="padding:6px 8px; text-align:right;">
+                    {currency_symbol}{total_internal:,.0f}
+                </td>
+            </tr>
+            <tr>
+                <td style="padding:6px 8px; font-weight:600;">Total Internal Cost + Total Overhead</td>
+                <td style="padding:6px 8px; text-align:right;">
+                    {currency_symbol}{total_final:,.0f}
+                </td>
+            </tr>
+            <tr>
+                <td style="padding:6px 8px; font-weight:600;">Total Margin Cost</td>
+                <td style="padding:6px 8px; text-align:right;">
+                    {currency_symbol}{total_margin:,.0f}
+                </td>
+            </tr>
+            <tr>
+                <td style="padding:6px 8px; font-weight:600;">Offered Discount</td>
+                <td style="padding:6px 8px; text-align:right;">
+                    {discount_pct:,}%
+                </td>
+            </tr>
+            <tr>
+                <td style="padding:6px 8px; font-weight:600;">Discounted Amount</td>
+                <td style="padding:6px 8px; text-align:right;">
+                    {currency_symbol}{discount_amount:,.0f}
+                </td>
+            </tr>
+            <tr>
+                <td style="
+                    padding:10px 8px;
+                    font-weight:700;
+                    font-size:20px;
+                    border-top:2px solid #333;
+                ">
+                    Total Project Amount
+                </td>
+                <td style="
+                    padding:10px 8px;
+                    text-align:right;
+                    font-size:26px;
+                    font-weight:800;
+                    color:#16a34a;
+                    border-top:2px solid #333;
+                ">
+                    {currency_symbol}{final_after_discount:,.0f}
+                </td>
+            </tr>
+        </table>
+        """,
+        unsafe_allow_html=True
+    )
 
-# =============================== TOTAL AMOUNT TABLE =====================================
-st.markdown(
-    f"""
-    <table style="
-        width:40%;
-        border-collapse:collapse;
-        margin-top:14px;
-        font-size:16px;
-    ">
-        <tr>
-            <td style="padding:6px 8px; font-weight:600;">Total Resource Count</td>
-            <td style="padding:6px 8px; text-align:right;">
-                {total_resource:,.0f}
-            </td>
-        </tr>
-        <tr>
-            <td style="padding:6px 8px; font-weight:600;">Total Project Duration</td>
-            <td style="padding:6px 8px; text-align:right;">
-                {total_duration:,.0f} Hrs
-            </td>
-        </tr>
-        <tr>
-            <td style="padding:6px 8px; font-weight:600;">Total Internal Cost</td>
-            <td style="padding:6px 8px; text-align:right;">
-                {currency_symbol}{total_internal:,.0f}
-            </td>
-        </tr>
-        <tr>
-            <td style="padding:6px 8px; font-weight:600;">Total Internal Cost + Total Overhead</td>
-            <td style="padding:6px 8px; text-align:right;">
-                {currency_symbol}{total_final:,.0f}
-            </td>
-        </tr>
-        <tr>
-            <td style="padding:6px 8px; font-weight:600;">Total Margin Cost</td>
-            <td style="padding:6px 8px; text-align:right;">
-                {currency_symbol}{total_margin:,.0f}
-            </td>
-        </tr>
-        <tr>
-            <td style="padding:6px 8px; font-weight:600;">Offered Discount</td>
-            <td style="padding:6px 8px; text-align:right;">
-                {discount_pct:,}%
-            </td>
-        </tr>
-        <tr>
-            <td style="padding:6px 8px; font-weight:600;">Discounted Amount</td>
-            <td style="padding:6px 8px; text-align:right;">
-                {currency_symbol}{discount_amount:,.0f}
-            </td>
-        </tr>
-        <tr>
-            <td style="
-                padding:10px 8px;
-                font-weight:700;
-                font-size:20px;
-                border-top:2px solid #333;
-            ">
-                Total Project Amount
-            </td>
-            <td style="
-                padding:10px 8px;
-                text-align:right;
-                font-size:26px;
-                font-weight:800;
-                color:#16a34a;
-                border-top:2px solid #333;
-            ">
-                {currency_symbol}{final_after_discount:,.0f}
-            </td>
-        </tr>
-    </table>
-    """,
-    unsafe_allow_html=True
-)
+    st.markdown("</div>", unsafe_allow_html=True)
 
-st.markdown("</div>", unsafe_allow_html=True)
+    currency = CLIENT_TYPES[client_type]["currency"]
+    if currency != BASE_CURRENCY:
+        fx = get_fx().rates()
+        st.caption(
+            f"Priced at 1 {currency} = ₹{fx_rate:,g} "
+            f"({fx.source}, as of {datetime.fromtimestamp(fx.fetched_at):%d %b %Y %H:%M})"
+        )
 
-# =========================== MILESTONE ======================================================
+    section_timer.lap("totals_table")
 
-if final_after_discount > 0 and not st.session_state.show_milestone:
-    # Smaller button on the left
-    btn_col_left, btn_col_right = st.columns([1, 10])  # Left column smaller, right column takes rest
+    # Milestones and reports read the quote and its exchange rate from session state
+    st.session_state.quote = quote
+    st.session_state.fx_rate = fx_rate
+    has_role_hours = any(role and hours for role, hours in zip(row_roles, quote.total_hours))
+    finish_fragment("team_structure", section_timer, (
+        final_after_discount > 0,
+        final_after_discount if st.session_state.show_milestone else None,
+        any(row_roles) and has_role_hours,
+        (row_roles, row_counts, row_hours, discount_pct, fx_rate) if st.session_state.get("reports_active") else None,
+        (row_roles, row_counts, row_hours, discount_pct) if st.session_state.get("show_scenarios") else None,
+    ))
 
-    with btn_col_left:
-        if st.button("Create Milestones", type="primary", use_container_width=False):
-            st.session_state.show_milestone = True
-            if not st.session_state.get("milestones"):
-                st.session_state.milestones = [{"name": "Milestone 1", "desc": "", "pct": 0.0}]
-            st.rerun()
 
-if "show_milestone" not in st.session_state:
-    st.session_state.show_milestone = False
+team_structure(overhead_factor, margin_factor_pct, client_type, currency_symbol)
 
-if "milestones" not in st.session_state:
-    st.session_state.milestones = [
-        {"name": "Milestone 1", "desc": "", "pct": 0.0}
-    ]
 
-if st.session_state.show_milestone and final_after_discount > 0:
+# =========================== TARGET PRICE SOLVER ===========================
+@st.fragment
+def target_solver(overhead_factor, client_type, currency_symbol):
+    # Searching for a team that fits a budget only reruns this panel
+    section_timer = fragment_timer()
+    role_master = current_roles()
 
-    h1, h2 = st.columns([1, 3])
+    with st.expander("🎯 Solve for a Target Price"):
+        s1, s2, s3, s4 = st.columns(4)
+        target = s1.number_input(f"Target Amount ({currency_symbol})", min_value=0, step=10000, key="solver_target")
+        min_margin, max_margin = s2.select_slider(
+            "Margin %",
+            options=list(MARGIN_OPTIONS),
+            value=(MARGIN_OPTIONS[0], MARGIN_OPTIONS[-1]),
+            key="solver_margin"
+        )
+        max_discount = s3.number_input("Max Discount %", min_value=0, max_value=100, step=5, key="solver_discount")
+        hour_step = s4.selectbox("Hours in Steps of", [8, 20, 40, 80, 160], index=2, key="solver_hour_step")
+
+        o1, o2 = st.columns(2)
+        objective = o1.radio(
+            "Prefer",
+            ["margin", "hours"],
+            format_func={"margin": "Best margin", "hours": "Most hours"}.get,
+            horizontal=True,
+            key="solver_objective"
+        )
+        top_n = o2.slider("Candidates", min_value=1, max_value=20, value=5, key="solver_top_n")
+
+        st.caption("Count and hours each role may take")
+        bounds = st.data_editor(
+            pd.DataFrame({"Role": list(role_master), "Min Count": 0, "Max Count": 1, "Min Hours": 40, "Max Hours": 480}),
+            column_config={
+                column: st.column_config.NumberColumn(column, min_value=0, step=1, required=True)
+                for column in ("Min Count", "Max Count", "Min Hours", "Max Hours")
+            },
+            disabled=["Role"],
+            hide_index=True,
+            key="solver_bounds"
+        )
 
-    with h1:
-        st.markdown("### 💎 Milestone Breakdown")
+        # Results only stand while the pricing inputs they were solved for do
+        params = (client_type, overhead_factor, fx_rate_for(client_type), get_rate_card().digest)
+        if st.button("🎯 Solve", type="primary", disabled=not target):
+            try:
+                candidates = solve(
+                    target,
+                    {
+                        row["Role"]: RoleBounds(
+                            int(row["Min Count"]), int(row["Max Count"]), int(row["Min Hours"]), int(row["Max Hours"])
+                        )
+                        for row in bounds.to_dict("records")
+                    },
+                    client_type=client_type,
+                    overhead_factor=overhead_factor,
+                    min_margin=min_margin,
+                    max_margin=max_margin,
+                    max_discount=max_discount,
+                    hour_step=hour_step,
+                    top_n=top_n,
+                    objective=objective,
+                    role_master=role_master,
+                    fx_rate=params[2]
+                )
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                candidates = None
+            st.session_state.solver_results = (params, candidates)
+            section_timer.lap("solve")
+
+        solved_params, candidates = st.session_state.get("solver_results", (None, None))
+        if candidates is not None and solved_params == params:
+            if not candidates:
+                st.info("No team fits within these bounds")
+            elif not candidates[0].feasible:
+                st.warning("⚠️ No team hits the target, these come closest")
+
+            for idx, candidate in enumerate(candidates):
+                c = st.columns([6, 1, 1, 1.5, 1.5, 1])
+                c[0].markdown(" · ".join(
+                    f"{row['count']}× {row['role']} ({row['hours']:,} Hrs)" for row in candidate.roles
+                ) or "No roles")
+                c[1].text(f"Margin {candidate.margin_pct}%")
+                c[2].text(f"Discount {candidate.discount_pct}%")
+                c[3].text(f"{currency_symbol}{candidate.quote.final_after_discount:,.0f}")
+                c[4].text(f"{'+' if candidate.gap >= 0 else '-'}{currency_symbol}{abs(candidate.gap):,.0f} vs target")
+                if c[5].button("Apply", key=f"solver_apply_{idx}", on_click=apply_solution, args=(candidate,)):
+                    st.rerun()
+
+    section_timer.lap("solver")
+    finish_fragment("target_solver", section_timer, None)
+
+
+target_solver(overhead_factor, client_type, currency_symbol)
+
+
+# =========================== SCENARIO MATRIX ===========================
+def scenario_frame(rows: list, role_master: dict, fx_rates: dict) -> pd.DataFrame:
+    # The team priced for every client type, overhead, margin and discount in one pass
+    grid = price_grid(
+        [row["role"] if row["role"] in role_master else "" for row in rows],
+        [row["count"] for row in rows],
+        [row["hours"] for row in rows],
+        list(CLIENT_TYPES),
+        SCENARIO_OVERHEADS,
+        MARGIN_OPTIONS,
+        SCENARIO_DISCOUNTS,
+        role_master=role_master,
+        fx_rates=fx_rates
+    )
+    frame = pd.DataFrame(
+        {
+            "amount": grid.final_after_discount.ravel(),
+            "earned": (grid.final_after_discount - grid.total_final[:, :, None, None]).ravel(),
+        },
+        index=pd.MultiIndex.from_product(
+            [grid.client_types, SCENARIO_OVERHEADS, list(MARGIN_OPTIONS), SCENARIO_DISCOUNTS],
+            names=["client", "overhead", "margin", "discount"]
+        )
+    ).reset_index()
+    symbols = frame["client"].map({client: spec["currency_symbol"] for client, spec in CLIENT_TYPES.items()})
+    frame["label"] = symbols + frame["amount"].map("{:,.0f}".format)
+    frame["earned_label"] = symbols + frame["earned"].map("{:,.0f}".format)
+    return frame
+
+
+@st.fragment
+def scenario_matrix(overhead_factor, margin_factor_pct, client_type):
+    section_timer = fragment_timer()
+    if not st.toggle("📊 Scenario matrix", key="show_scenarios"):
+        finish_fragment("scenario_matrix", section_timer, None)
+        return
+
+    # Priced once per team, rate card and exchange rates, and shared by every
+    # session. The discount and client type are picked in the browser, so
+    # exploring the grid does not rerun anything.
+    rows = team_rows()
+    role_master = current_roles()
+    fx_rates = {client: fx_rate_for(client) for client in CLIENT_TYPES}
+    key = "scenario:" + hashlib.sha256(repr((
+        [(row["role"], row["count"], row["hours"]) for row in rows],
+        get_rate_card().digest,
+        sorted(fx_rates.items())
+    )).encode("utf-8")).hexdigest()
+    frame = get_shared_cache().get_or_compute(
+        key, lambda: scenario_frame(rows, role_master, fx_rates), get_script_run_ctx().session_id
+    )
+    section_timer.lap("scenario_grid")
+
+    # Altair is only needed once the matrix is switched on
+    alt = timed_import("altair")
+    discount = alt.param(
+        name="discount",
+        value=min(SCENARIO_DISCOUNTS, key=lambda d: abs(d - st.session_state.discount_pct)),
+        bind=alt.binding_range(min=SCENARIO_DISCOUNTS[0], max=SCENARIO_DISCOUNTS[-1], step=5, name="Discount % ")
+    )
+    client = alt.param(
+        name="client",
+        value=client_type,
+        bind=alt.binding_radio(options=list(CLIENT_TYPES), name="Client Type ")
+    )
+    base = alt.Chart(frame).transform_filter(
+        (alt.datum.discount == discount) & (alt.datum.client == client)
+    ).encode(
+        x=alt.X("margin:O", title="Margin %", axis=alt.Axis(orient="top", labelAngle=0)),
+        y=alt.Y("overhead:O", title="Overhead Factor")
+    )
+    cells = base.mark_rect().encode(
+        color=alt.Color("amount:Q", title="Total Project Amount", scale=alt.Scale(scheme="yellowgreen"), legend=None),
+        tooltip=[
+            alt.Tooltip("overhead:O", title="Overhead Factor"),
+            alt.Tooltip("margin:O", title="Margin %"),
+            alt.Tooltip("discount:O", title="Discount %"),
+            alt.Tooltip("label:N", title="Total Project Amount"),
+            alt.Tooltip("earned_label:N", title="Margin after Discount"),
+        ]
+    )
+    labels = base.mark_text(fontSize=12).encode(text="label:N")
+    # Outlines the overhead and margin currently picked above
+    current = base.mark_rect(fill=None, stroke="#111", strokeWidth=2).transform_filter(
+        (alt.datum.overhead == round(overhead_factor, 1)) & (alt.datum.margin == margin_factor_pct)
+    )
+    st.altair_chart(
+        alt.layer(cells, labels, current).add_params(discount, client).properties(height=32 * len(SCENARIO_OVERHEADS)),
+        width="stretch"
+    )
+    st.caption("Total Project Amount of the current team. Hover a cell for the margin left after the discount.")
 
-    total_placeholder = h2.empty()
+    section_timer.lap("scenario_matrix")
+    finish_fragment("scenario_matrix", section_timer, None)
 
-    total_pct = 0
-    success_placeholder = st.empty()
 
-    for i, m in enumerate(st.session_state.milestones):
-        c1, c2, c3, c4, c5 = st.columns([3, 4, 1, 2, 0.6])
+scenario_matrix(overhead_factor, margin_factor_pct, client_type)
 
-        with c1:
-            m["name"] = st.text_input(
-                "Milestone Name",
-                m["name"],
-                key=f"ms_name_{i}"
-            )
-        with c2:
-            m["desc"] = st.text_input(
-                "Description",
-                value="",
-                placeholder="",
-                key=f"ms_desc_{i}"
-            )
 
-        with c3:
-            m["pct"] = st.number_input(
-                "Percentage %",
-                min_value=0,
-                max_value=100,
-                step=5,
-                key=f"ms_pct_{i}"
-            )
+@st.fragment
+def milestone_breakdown(currency_symbol):
+    section_timer = fragment_timer()
+    final_after_discount = st.session_state.quote.final_after_discount
 
-        with c4:
-            amount = final_after_discount * m["pct"] / 100
-            st.markdown(
-                f"""
-                <div style="font-weight:600; padding-top:28px; color:#16a34a;">
-                    {currency_symbol}{amount:,.0f}
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+    # =========================== MILESTONE ======================================================
 
-        with c5:
-            st.markdown("<div style='padding-top:22px;'>", unsafe_allow_html=True)
-            if st.button("🗑️", key=f"remove_ms_{i}"):
-                if len(st.session_state.milestones) > 1:
-                    # Remove only this milestone
-                    st.session_state.milestones.pop(i)
-                else:
-                    # Last milestone → clear all
-                    st.session_state.milestones = []
-                    st.session_state.show_milestone = False
+    if final_after_discount > 0 and not st.session_state.show_milestone:
+        # Smaller button on the left
+        btn_col_left, btn_col_right = st.columns([1, 10])  # Left column smaller, right column takes rest
+
+        with btn_col_left:
+            if st.button("Create Milestones", type="primary", use_container_width=False):
+                st.session_state.show_milestone = True
+                if not st.session_state.get("milestones"):
+                    st.session_state.milestones = [{"name": "Milestone 1", "desc": "", "pct": 0.0}]
                 st.rerun()
 
-            st.markdown("</div>", unsafe_allow_html=True)
+    if st.session_state.show_milestone and final_after_discount > 0:
 
-        total_pct += m["pct"]
+        h1, h2 = st.columns([1, 3])
 
-    color = "#16a34a" if total_pct == 100 else "#dc2626"
+        with h1:
+            st.markdown("### 💎 Milestone Breakdown")
 
-    # ➕ Add milestone
-    if total_pct < 100:
-        col_btn, col_total = st.columns([3, 1.5])
+        total_placeholder = h2.empty()
 
-        with col_btn:
-            st.button("➕ Add Milestone", on_click=add_milestone)
+        total_pct = 0
+        success_placeholder = st.empty()
 
-        with col_total:
-            st.markdown(
-                f"""
-                    <div style="
-                        text-align:left;
-                        font-weight:700;
-                        font-size:22px;
-                        color:{color};
-                        padding-top:10px;
-                    ">
-                        Total Allocated: {total_pct:.0f}%
+        # Split exactly as on the reports, from the percentages the widgets hold now
+        milestone_amounts = split_milestones(
+            final_after_discount,
+            [st.session_state.get(f"ms_pct_{i}", m["pct"]) for i, m in enumerate(st.session_state.milestones)]
+        )
+
+        for i, m in enumerate(st.session_state.milestones):
+            c1, c2, c3, c4, c5 = st.columns([3, 4, 1, 2, 0.6])
+
+            with c1:
+                m["name"] = st.text_input(
+                    "Milestone Name",
+                    m["name"],
+                    key=f"ms_name_{i}"
+                )
+            with c2:
+                m["desc"] = st.text_input(
+                    "Description",
+                    value="",
+                    placeholder="",
+                    key=f"ms_desc_{i}"
+                )
+
+            with c3:
+                m["pct"] = st.number_input(
+                    "Percentage %",
+                    min_value=0,
+                    max_value=100,
+                    step=5,
+                    key=f"ms_pct_{i}"
+                )
+
+            with c4:
+                st.markdown(
+                    f"""
+                    <div style="font-weight:600; padding-top:28px; color:#16a34a;">
+                        {currency_symbol}{milestone_amounts[i]:,.0f}
                     </div>
                     """,
-                unsafe_allow_html=True
-            )
-    # Success if 100%
-    if total_pct == 100:
-        success_placeholder.success("✅ Milestones allocated successfully")
-
-    elif total_pct > 100:
-        st.warning("⚠️ Total milestone percentage cannot exceed 100%")
-
-# =================================== Data for PDF ==========================================================
-
-# Prepare roles data
-HOURS_PER_DAY = 8
-roles_data = []
-total_project_hours = 0
-total_manpower = 0
-
-for idx in range(len(st.session_state.rows)):
-    role = st.session_state.get(f"role_{idx}")
-    if role:
-        count = st.session_state.get(f"count_{idx}", 0)
-        hours = st.session_state.get(f"hours_{idx}", 0)
-
-        comp = ROLES[role]["comp"] * conversion_rate
-        emp = comp / 2080
-        overhead = emp * overhead_factor
-        margin_rate = overhead / margin_divisor
-        total_hours = count * hours
-        internal_cost = total_hours * emp
-        final_amount = total_hours * overhead
-        margin_amount = final_amount / margin_factor
-
-        role_total_hours = count * hours
-        total_project_hours += role_total_hours
-        total_manpower += count
-
-        roles_data.append({
-            "Role": role,
-            "Count": count,
-            "Hours": hours,
-            "Margin": margin_rate,
-            "Margin_Amount": margin_amount
-        })
-
-total_project_days = math.ceil(total_project_hours / HOURS_PER_DAY)
-
-
-# Prepare milestone data
-milestone_data = []
-if st.session_state.show_milestone and st.session_state.milestones:
-    rounded_project_total = int(round(final_after_discount))
-    percentages = [m["pct"] for m in st.session_state.milestones]
-    milestone_count = len(percentages)
-    milestone_amounts = []
-
-    # Handle rounding
-    running_total = 0
-    for i, pct in enumerate(percentages):
-        if i < milestone_count - 1:
-            amt = round(rounded_project_total * pct / 100)
-            milestone_amounts.append(amt)
-            running_total += amt
-        else:
-            milestone_amounts.append(rounded_project_total - running_total)
-
-    for i, m in enumerate(st.session_state.milestones):
-        milestone_data.append({
-            "Name": m["name"],
-            "Description": m["desc"],
-            "Percentage": m["pct"],
-            "Amount": milestone_amounts[i]
-        })
+                    unsafe_allow_html=True
+                )
+
+            with c5:
+                st.markdown("<div style='padding-top:22px;'>", unsafe_allow_html=True)
+                if st.button("🗑️", key=f"remove_ms_{i}"):
+                    if len(st.session_state.milestones) > 1:
+                        # Remove only this milestone
+                        st.session_state.milestones.pop(i)
+                    else:
+                        # Last milestone → clear all
+                        st.session_state.milestones = []
+                        st.session_state.show_milestone = False
+                    st.rerun()
+
+                st.markdown("</div>", unsafe_allow_html=True)
+
+            total_pct += m["pct"]
+
+        color = "#16a34a" if total_pct == 100 else "#dc2626"
+
+        # ➕ Add milestone
+        if total_pct < 100:
+            col_btn, col_total = st.columns([3, 1.5])
+
+            with col_btn:
+                st.button("➕ Add Milestone", on_click=add_milestone)
+
+            with col_total:
+                st.markdown(
+                    f"""
+                        <div style="
+                            text-align:left;
+                            font-weight:700;
+                            font-size:22px;
+                            color:{color};
+                            padding-top:10px;
+                        ">
+                            Total Allocated: {total_pct:.0f}%
+                        </div>
+                        """,
+                    unsafe_allow_html=True
+                )
+        # Success if 100%
+        if total_pct == 100:
+            success_placeholder.success("✅ Milestones allocated successfully")
+
+        elif total_pct > 100:
+            st.warning("⚠️ Total milestone percentage cannot exceed 100%")
+
+    section_timer.lap("milestones")
+
+    milestones = st.session_state.milestones if st.session_state.show_milestone else []
+    finish_fragment("milestone_breakdown", section_timer, (
+        not milestones or sum(m["pct"] for m in milestones) == 100,
+        [dict(m) for m in milestones] if st.session_state.get("reports_active") else None,
+    ))
+
+
+milestone_breakdown(currency_symbol)
 
 # =========================== UPLOAD DOCUMENTS ===========================
 st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
@@ -591,152 +1123,241 @@ if "functional_doc" not in st.session_state:
     st.session_state.functional_doc = None
 
 
-st.markdown("**User Requirement Document**")
-u1, u2 = st.columns([3, 4])
+document_upload("User Requirement Document", "user_doc")
+document_upload("Functional Requirement Document", "functional_doc")
+
+attachments = [
+    doc for doc in (st.session_state.user_doc, st.session_state.functional_doc)
+    if doc and is_pdf(doc)
+]
+if attachments:
+    st.checkbox("Append the uploaded PDFs to the reports", key="attach_docs")
+
+st.markdown("</div>", unsafe_allow_html=True)
 
-with u1:
-    user_doc = st.file_uploader(
-        "User Requirement Document",
-        type=["pdf", "doc", "docx"],
-        key="user_doc_uploader",
-        label_visibility="collapsed"
+timer.lap("uploads")
+
+
+@st.fragment
+def report_downloads(project_name, project_description, client_type, overhead_factor,
+                     margin_factor_pct, generated_on, attachments):
+    section_timer = fragment_timer()
+    quote = st.session_state.quote
+    discount_pct = st.session_state.discount_pct
+    rows = team_rows()
+
+    # =================================== Data for PDF ==========================================================
+
+    quote_definition = {
+        "project_name": project_name,
+        "project_description": project_description,
+        "client_type": client_type,
+        "overhead_factor": overhead_factor,
+        "margin_pct": margin_factor_pct,
+        "discount_pct": discount_pct,
+        "fx_rate": st.session_state.fx_rate,
+        "roles": [dict(row) for row in rows],
+        "milestones": st.session_state.milestones if st.session_state.show_milestone else [],
+        "user_doc": st.session_state.user_doc,
+        "functional_doc": st.session_state.functional_doc
+    }
+    internal_context, client_context = build_report_contexts(quote_definition, generated_on, quote)
+    total_project_hours = internal_context["total_project_hours"]
+
+    section_timer.lap("pdf_data_prep")
+
+    # =========================== VALIDATION ===========================
+    has_project_name = bool(project_name.strip())
+
+    has_valid_role = any(row["role"] for row in rows)
+
+    milestones_valid = (
+            not st.session_state.show_milestone
+            or sum(m["pct"] for m in st.session_state.milestones) == 100
     )
-    if user_doc:
-        st.session_state.user_doc = user_doc
 
-# with u2:
-st.markdown("**Functional Requirement Document**")
+    can_download = (
+            has_project_name
+            and has_valid_role
+            and total_project_hours > 0
+            and milestones_valid
+    )
 
-col1, col2 = st.columns([3, 4])   # adjust ratio to control width
+    reports_active = False
+    if can_download:
+        reports = {
+            "internal": {
+                "template": INTERNAL_TEMPLATE,
+                "context": internal_context,
+                "label": "📄 Download Internal Report",
+                "file_name": f"{project_name} Internal Quotation.pdf",
+            },
+            "client": {
+                "template": CLIENT_TEMPLATE,
+                "context": client_context,
+                "label": "📄 Download Client Report",
+                "file_name": f"{project_name} Client Quotation.pdf",
+            },
+        }
+        for report in reports.values():
+            report["key"] = report_key(report["template"], report["context"])
+        # Download buttons and progress both depend on the exact inputs, so the
+        # other sections rerun the page when they change while either is shown
+        reports_active = True
+
+        shared_cache = get_shared_cache()
+        session_id = get_script_run_ctx().session_id
+
+        # Only jobs started for the current inputs are relevant
+        jobs = {
+            kind: (key, future)
+            for kind, (key, future) in st.session_state.get("report_jobs", {}).items()
+            if key == reports[kind]["key"]
+        }
 
-with col1:
-    functional_doc = st.file_uploader(
-        "Functional Requirement Document",
-        type=["pdf", "doc", "docx"],
-        key="functional_doc_uploader",
-        label_visibility="collapsed"
+        if all(shared_cache.hold(report["key"], session_id) for report in reports.values()):
+            # The cache has the PDFs now, the finished jobs need not keep them too
+            st.session_state.pop("report_jobs", None)
+            for kind, report in reports.items():
+                st.download_button(
+                    report["label"],
+                    data=deferred_pdf(report["template"], report["context"], attachments),
+                    file_name=report["file_name"],
+                    mime="application/pdf",
+                    type="primary",
+                    on_click="ignore",
+                    key=f"{kind}_report_download"
+                )
+        elif any(not future.done() for _, future in jobs.values()):
+            report_progress(jobs)
+        else:
+            reports_active = bool(jobs)
+            if any(job_failed(future) for _, future in jobs.values()):
+                st.error("❌ Report generation failed, please try again")
+
+            if st.button("📄 Generate Reports", type="primary"):
+                try:
+                    submit_reports(reports)
+                except RenderQueueFull as e:
+                    st.warning(f"⚠️ {e}")
+                else:
+                    st.rerun()
+
+        if st.button("💾 Save Quote"):
+            # Reports rendered for these exact inputs are stored with the quote
+            pdfs = {kind: shared_cache.get(report["key"], session_id) for kind, report in reports.items()
+                    if report["key"] in shared_cache}
+            quote_id = get_quote_store().save(quote_definition, quote, pdfs)
+            st.success(f"✅ Saved as quote #{quote_id}")
+
+    st.markdown(
+        "<div style='margin-top:40px; font-size:13px; color:#555;'>"
+        "<span style='color:red;'>*</span> indicates required fields"
+        "</div>",
+        unsafe_allow_html=True
     )
-    if functional_doc:
-        st.session_state.user_doc = functional_doc
 
-st.markdown("</div>", unsafe_allow_html=True)
+    section_timer.lap("reports")
 
-# =========================== VALIDATION ===========================
-has_project_name = bool(project_name.strip())
+    st.session_state.reports_active = reports_active
+    finish_fragment("report_downloads", section_timer, None)
 
-has_valid_role = any(
-    st.session_state.get(f"role_{i}")
-    for i in range(len(st.session_state.rows))
-)
 
-milestones_valid = (
-        not st.session_state.show_milestone
-        or sum(m["pct"] for m in st.session_state.milestones) == 100
+report_downloads(
+    project_name, project_description, client_type, overhead_factor, margin_factor_pct, generated_on,
+    attachments if st.session_state.get("attach_docs") else []
 )
 
-can_download = (
-        has_project_name
-        and has_valid_role
-        and total_project_hours > 0
-        and milestones_valid
-)
 
-if can_download:
-    rendered_html = internal_template.render(
-        generated_on=generated_on,
-        logo_path=logo_path,
-        project_name=project_name,
-        project_description=project_description,
-        total_project_hours=total_project_hours,
-        total_project_days=total_project_days,
-        total_internal=total_internal,
-        total_final=total_final,
-        total_margin=total_margin,
-        discount_pct=discount_pct,
-        discount_amount=discount_amount,
-        final_after_discount=final_after_discount,
-        total_manpower=total_manpower,
-        roles_data=roles_data,
-        milestone_data=milestone_data,
-        currency_symbol=currency_symbol,
-        user_doc=st.session_state.user_doc,
-        functional_doc=st.session_state.functional_doc
-    )
+# =========================== SAVED QUOTES ===========================
+@st.fragment
+def saved_quotes():
+    # Searching and picking a quote only reruns this panel
+    store = get_quote_store()
+    st.markdown("### 📂 Saved Quotes")
+    name_prefix = st.text_input("Project name starts with", key="saved_quotes_search")
+    client_filter = st.selectbox("Client Type", ["All", *CLIENT_TYPES], key="saved_quotes_client")
+    quotes = store.list(name_prefix.strip(), None if client_filter == "All" else client_filter)
+    if not quotes:
+        st.caption("No saved quotes")
+        return
+
+    labels = {
+        q["id"]: f"#{q['id']} {q['project_name']} · {CLIENT_TYPES[q['client_type']]['currency_symbol']}"
+                 f"{q['total_amount']:,.0f} · {q['created_at'].replace('T', ' ')}"
+        for q in quotes
+    }
+    quote_id = st.selectbox("Quote", list(labels), format_func=labels.get, key="saved_quote_id")
+    if st.button("Load Quote", on_click=load_quote, args=(quote_id,)):
+        st.rerun()
+
+    for kind in store.load(quote_id)["pdfs"]:
+        st.download_button(
+            f"📄 Saved {kind.title()} Report",
+            data=partial(store.pdf, quote_id, kind),
+            file_name=f"{labels[quote_id].split(' · ')[0]} {kind.title()} Quotation.pdf",
+            mime="application/pdf",
+            on_click="ignore",
+            key=f"saved_{kind}_report_download"
+        )
 
-    internal_buffer = generate_pdf_from_html(rendered_html)
 
-    # ---------- CLIENT REPORT ----------
-    client_html = client_template.render(
-        logo_path=logo_path,
-        project_name=project_name,
-        project_description=project_description,
-        total_project_hours=total_project_hours,
-        total_project_days=total_project_days,
-        total_margin=total_margin,
-        discount_pct=discount_pct,
-        final_after_discount=final_after_discount,
-        total_manpower=total_manpower,
-        roles_data=roles_data,
-        milestone_data=milestone_data,
-        currency_symbol=currency_symbol,
-        user_doc=st.session_state.user_doc,
-        functional_doc=st.session_state.functional_doc
-    )
+with st.sidebar:
+    saved_quotes()
 
-    client_buffer = generate_pdf_from_html(client_html)
+# =========================== PERFORMANCE ===========================
+perf_recorder = get_perf_recorder()
+perf_recorder.add_timer(timer)
 
-    if internal_buffer and client_buffer:
-        internal_pdf_base64 = base64.b64encode(internal_buffer.getvalue()).decode('utf-8')
-        client_pdf_base64 = base64.b64encode(client_buffer.getvalue()).decode('utf-8')
+# The page is drawn by now, so importing the PDF stack and compiling the
+# templates in the background no longer delays the first paint
+start_prewarm()
 
-        st.markdown(
-            f"""
-                <div style="display:flex; justify-content:left; margin-top:10px;">
-                    <a href="data:application/pdf;base64,{internal_pdf_base64}" 
-                       download="{project_name} Internal Quotation.pdf"
-                       style="
-                           text-decoration:none;
-                           border:2px solid #2563eb;
-                           background:#2563eb;
-                           color:white;
-                           padding:8px 20px;
-                           border-radius:8px;
-                           font-size:16px;
-                           font-weight:600;
-                           cursor:pointer;
-                       ">
-                        📄 Generate Internal Report
-                    </a>
-                </div>
-                """,
-            unsafe_allow_html=True
+if st.query_params.get("debug") == "1":
+    with st.sidebar:
+        st.markdown("### ⏱️ Performance")
+        st.markdown(f"**This rerun:** {timer.total_ms:,.1f} ms")
+        st.dataframe(
+            [{"Stage": stage, "ms": round(ms, 2)} for stage, ms in timer.durations.items()],
+            hide_index=True
         )
-        st.markdown(
-            f"""
-                <div style="display:flex; justify-content:left; margin-top:10px;">
-                    <a href="data:application/pdf;base64,{client_pdf_base64}" 
-                       download="{project_name} Client Quotation.pdf"
-                       style="
-                           text-decoration:none;
-                           border:2px solid #2563eb;
-                           background:#2563eb;
-                           color:white;
-                           padding:8px 20px;
-                           border-radius:8px;
-                           font-size:16px;
-                           font-weight:600;
-                           cursor:pointer;
-                       ">
-                        📄 Generate Client Report
-                    </a>
-                </div>
-                """,
-            unsafe_allow_html=True
+        st.markdown("**All sessions (rolling)**")
+        st.dataframe(
+            [{"Stage": stage, **stats} for stage, stats in sorted(perf_recorder.summary().items())],
+            hide_index=True
         )
 
-st.markdown(
-    "<div style='margin-top:40px; font-size:13px; color:#555;'>"
-    "<span style='color:red;'>*</span> indicates required fields"
-    "</div>",
-    unsafe_allow_html=True
-)
+        # Memory of the shared cache, by session, for everyone on this server
+        st.markdown("### 🧠 Shared Cache")
+        cache = get_shared_cache()
+        cache_stats = cache.stats()
+        st.markdown(
+            f"**{cache_stats['bytes'] / 2 ** 20:,.1f} of {cache_stats['max_bytes'] / 2 ** 20:,.0f} MB** "
+            f"in {cache_stats['entries']} entries · hit rate {cache_stats['hit_rate']:.0%}"
+        )
+        this_session = get_script_run_ctx().session_id
+        st.dataframe(
+            [
+                {
+                    "Session": session["session"][:8] + (" (this)" if session["session"] == this_session else ""),
+                    "MB": round(session["bytes"] / 2 ** 20, 2),
+                    "Shared MB": round(session["shared_bytes"] / 2 ** 20, 2),
+                    "Entries": session["entries"],
+                    "Idle s": session["idle_seconds"],
+                }
+                for session in cache.session_stats()
+            ],
+            hide_index=True
+        )
+        st.json({"shared_cache": cache_stats, "uploads": get_upload_store().stats()}, expanded=False)
+
+        # Lazy imports and background warm-up of this server process
+        st.markdown("### 🚀 Startup")
+        startup = startup_report()
+        st.markdown(f"**Pre-warm:** {startup['prewarm']}")
+        st.dataframe(
+            [{"Import": name, "ms": round(seconds * 1000, 1)} for name, seconds in startup["imports"].items()]
+            + [{"Import": f"({stage})", "ms": round(seconds * 1000, 1)}
+               for stage, seconds in startup["prewarm_stages"].items()],
+            hide_index=True
+        )
@@ -0,0 +1,75 @@
+import base64
+import os
+import threading
+from io import BytesIO
+
+from PIL import Image
+from reportlab.lib.fonts import addMapping
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from xhtml2pdf import default as pisa_default
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+FONT_NAME = "NotoSans"
+FONT_FILE = "NotoSans-Regular.ttf"
+LOGO_FILE = "ormae_logo.png"
+
+# The report stylesheets show the logo at most 110px wide; keep 4x that
+# for print sharpness instead of decoding the full-size image every render.
+LOGO_MAX_WIDTH = 440
+
+_lock = threading.Lock()
+_fonts_registered = False
+_logo_png = None
+_logo_data_uri = None
+
+
+def register_fonts():
+    """Register the report font with reportlab once per process.
+
+    pisa looks font families up in ``DEFAULT_FONT``, so the templates can use
+    ``font-family: NotoSans`` without an @font-face rule that would make
+    every render parse and embed the TTF again.
+    """
+    global _fonts_registered
+    with _lock:
+        if _fonts_registered:
+            return
+        pdfmetrics.registerFont(TTFont(FONT_NAME, os.path.join(TEMPLATES_DIR, FONT_FILE)))
+        # Only the regular face ships with the app, use it for every style
+        for bold in (0, 1):
+            for italic in (0, 1):
+                addMapping(FONT_NAME, bold, italic, FONT_NAME)
+        pisa_default.DEFAULT_FONT[FONT_NAME.lower()] = FONT_NAME
+        _fonts_registered = True
+
+
+def logo_png() -> bytes:
+    # Decoded, downscaled and re-encoded once per process
+    global _logo_png
+    with _lock:
+        if _logo_png is None:
+            with Image.open(os.path.join(TEMPLATES_DIR, LOGO_FILE)) as image:
+                image.thumbnail((LOGO_MAX_WIDTH, LOGO_MAX_WIDTH), Image.LANCZOS)
+                buffer = BytesIO()
+                image.save(buffer, format="PNG", optimize=True)
+            _logo_png = buffer.getvalue()
+        return _logo_png
+
+
+def logo_data_uri() -> str:
+    global _logo_data_uri
+    if _logo_data_uri is None:
+        _logo_data_uri = "data:image/png;base64," + base64.b64encode(logo_png()).decode("ascii")
+    return _logo_data_uri
+
+
+def link_callback(uri: str, rel: str):
+    # pisa resolves every external resource through here
+    name = os.path.basename(uri)
+    if name == LOGO_FILE:
+        return logo_data_uri()
+    if name == FONT_FILE:
+        return os.path.join(TEMPLATES_DIR, FONT_FILE)
+    return uri
@@ -0,0 +1,307 @@
+"""Price quotation scenarios in bulk, without the Streamlit page.
+
+Scenarios are read from CSV or JSON Lines and priced with the same role
+master and formulas as the calculator. Input and output are streamed, so
+memory stays constant however many scenarios there are.
+
+JSON Lines: one scenario per line, for example
+    {"project": "Acme", "client_type": "USA", "overhead_factor": 1.4,
+     "margin_pct": 30, "discount_pct": 5,
+     "roles": [{"role": "Data Engineer", "count": 2, "hours": 160}]}
+
+CSV: columns project, client_type, overhead_factor, margin_pct,
+discount_pct and roles, where roles is "Role:count:hours;Role:count:hours".
+
+Missing parameters fall back to the page defaults, and an optional fx_rate
+(rupees per unit of the client's currency) to the current exchange rate,
+which is written to the output. The --client-type,
+--overhead, --margin and --discount options take comma-separated values
+and expand every input scenario over all their combinations. A scenario
+that cannot be read or priced gets a row with the error, and the run goes
+on; the exit status is then 1.
+
+    python batch_quote.py scenarios.jsonl -o results.csv --workers 4 --margin 10,20,30,40,50
+"""
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pricing import DEFAULT_MARGIN_PCT, DEFAULT_OVERHEAD_FACTOR, CLIENT_TYPES, fx_rate_for, price_items
+
+OUTPUT_FIELDS = [
+    "project",
+    "client_type",
+    "overhead_factor",
+    "margin_pct",
+    "discount_pct",
+    "currency",
+    "fx_rate",
+    "total_resource",
+    "total_duration",
+    "total_internal",
+    "total_final",
+    "total_margin",
+    "discount_amount",
+    "final_after_discount",
+    "error",
+]
+
+
+def parse_roles(value: str):
+    items = []
+    for part in filter(None, (p.strip() for p in value.split(";"))):
+        if part.count(":") < 2:
+            raise ValueError(f"roles must be Role:count:hours, got {part!r}")
+        role, count, hours = part.rsplit(":", 2)
+        items.append({"role": role.strip(), "count": int(count), "hours": int(hours)})
+    return items
+
+
+def parse_json_line(line: str):
+    if not line.strip():
+        return None
+    scenario = json.loads(line)
+    if not isinstance(scenario, dict):
+        raise ValueError("a scenario must be a JSON object")
+    return scenario
+
+
+def parse_csv_row(row: dict):
+    scenario = {k: v for k, v in row.items() if v not in (None, "")}
+    scenario["roles"] = parse_roles(scenario.get("roles", ""))
+    return scenario
+
+
+def parse_records(records, parse, unit: str):
+    # A record that cannot be parsed is passed on as {"error": ...}, so it
+    # gets an error row and the run goes on
+    for number, record in enumerate(records, 1):
+        try:
+            scenario = parse(record)
+        except (ValueError, TypeError, AttributeError) as e:
+            yield {"error": f"invalid scenario on {unit} {number}: {e}"}
+            continue
+        if scenario is not None:
+            yield scenario
+
+
+def read_scenarios(path: str):
+    # Yields scenario dicts one at a time; "-" reads JSON Lines from stdin
+    if path == "-":
+        yield from parse_records(sys.stdin, parse_json_line, "line")
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            yield from parse_records(csv.DictReader(f), parse_csv_row, "row")
+        else:
+            yield from parse_records(f, parse_json_line, "line")
+
+
+def expand_scenarios(scenarios, sweep: dict):
+    # Cartesian product of each scenario with the swept parameter values
+    names = [name for name, values in sweep.items() if values]
+    for scenario in scenarios:
+        if not names or "error" in scenario:
+            yield scenario
+            continue
+        for combo in itertools.product(*(sweep[name] for name in names)):
+            yield {**scenario, **dict(zip(names, combo))}
+
+
+def price_scenario(scenario: dict) -> dict:
+    if "error" in scenario:
+        # A record that could not be read, see parse_records
+        return {"error": scenario["error"]}
+    client_type = scenario.get("client_type", "IND")
+    result = {
+        "project": str(scenario.get("project", "")),
+        "client_type": str(client_type),
+        "overhead_factor": None,
+        "margin_pct": None,
+        "discount_pct": None,
+        "error": "",
+    }
+
+    # Anything wrong with one scenario is reported in its row, the run goes on
+    try:
+        result.update(
+            overhead_factor=float(scenario.get("overhead_factor", DEFAULT_OVERHEAD_FACTOR)),
+            margin_pct=float(scenario.get("margin_pct", DEFAULT_MARGIN_PCT)),
+            discount_pct=float(scenario.get("discount_pct", 0))
+        )
+        items = scenario.get("roles", [])
+        fx_rate = float(scenario.get("fx_rate") or fx_rate_for(client_type))
+        # The same limits as the page and the API
+        numbers = (result["overhead_factor"], result["margin_pct"], result["discount_pct"], fx_rate)
+        if not all(map(math.isfinite, numbers)):
+            raise ValueError("numbers must be finite")
+        if not 0 <= result["margin_pct"] < 100:
+            raise ValueError("margin_pct must be at least 0 and below 100")
+        if not 0 <= result["discount_pct"] <= 100:
+            raise ValueError("discount_pct must be between 0 and 100")
+        if not result["overhead_factor"] > 0:
+            raise ValueError("overhead_factor must be positive")
+        if not fx_rate > 0:
+            raise ValueError("fx_rate must be positive")
+        quote = price_items(
+            [item["role"] for item in items],
+            [int(item.get("count", 0)) for item in items],
+            [int(item.get("hours", 0)) for item in items],
+            overhead_factor=result["overhead_factor"],
+            margin_pct=result["margin_pct"],
+            discount_pct=result["discount_pct"],
+            client_type=client_type,
+            fx_rate=fx_rate
+        )
+    except KeyError as e:
+        result["error"] = f"unknown role or client type: {e.args[0]}"
+        return result
+    except (ValueError, TypeError, AttributeError) as e:
+        result["error"] = f"invalid scenario: {e}"
+        return result
+
+    result.update(
+        currency=CLIENT_TYPES[client_type]["currency"],
+        fx_rate=fx_rate,
+        total_resource=quote.total_resource,
+        total_duration=quote.total_duration,
+        total_internal=round(quote.total_internal, 2),
+        total_final=round(quote.total_final, 2),
+        total_margin=round(quote.total_margin, 2),
+        discount_amount=round(quote.discount_amount, 2),
+        final_after_discount=round(quote.final_after_discount, 2)
+    )
+    return result
+
+
+def price_chunk(chunk: list) -> list:
+    return [price_scenario(scenario) for scenario in chunk]
+
+
+def chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def price_all(scenarios, workers: int = 1, chunk_size: int = 500):
+    """Yield priced results in input order.
+
+    With several workers, at most ``2 * workers`` chunks are in flight, so
+    the input is never read far ahead of the output.
+    """
+    if workers <= 1:
+        for chunk in chunked(scenarios, chunk_size):
+            yield from price_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk in chunked(scenarios, chunk_size):
+            in_flight.append(executor.submit(price_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+class CSVResultWriter:
+    def __init__(self, path: str):
+        self._file = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS)
+        self._writer.writeheader()
+
+    def write_batch(self, rows: list):
+        self._writer.writerows(rows)
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class ParquetResultWriter:
+    def __init__(self, path: str):
+        # pyarrow is only needed for Parquet output
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("project", pa.string()),
+            ("client_type", pa.string()),
+            ("overhead_factor", pa.float64()),
+            ("margin_pct", pa.float64()),
+            ("discount_pct", pa.float64()),
+            ("currency", pa.string()),
+            ("fx_rate", pa.float64()),
+            ("total_resource", pa.int64()),
+            ("total_duration", pa.int64()),
+            ("total_internal", pa.float64()),
+            ("total_final", pa.float64()),
+            ("total_margin", pa.float64()),
+            ("discount_amount", pa.float64()),
+            ("final_after_discount", pa.float64()),
+            ("error", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write_batch(self, rows: list):
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def parse_list(cast):
+    def parse(value: str):
+        return [cast(v.strip()) for v in value.split(",") if v.strip()]
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price quotation scenarios from CSV or JSON Lines.")
+    parser.add_argument("input", help="scenarios file (.csv or .jsonl), or - for JSON Lines on stdin")
+    parser.add_argument("-o", "--output", default="-", help="results file (.csv or .parquet), default stdout CSV")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, 0 for one per CPU")
+    parser.add_argument("--chunk-size", type=int, default=500, help="scenarios per worker task")
+    parser.add_argument("--client-type", type=parse_list(str), help="sweep client types, e.g. IND,USA")
+    parser.add_argument("--overhead", type=parse_list(float), help="sweep overhead factors, e.g. 1.2,1.4")
+    parser.add_argument("--margin", type=parse_list(float), help="sweep margin percentages, e.g. 20,30")
+    parser.add_argument("--discount", type=parse_list(float), help="sweep discount percentages, e.g. 0,5,10")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    scenarios = expand_scenarios(read_scenarios(args.input), {
+        "client_type": args.client_type,
+        "overhead_factor": args.overhead,
+        "margin_pct": args.margin,
+        "discount_pct": args.discount,
+    })
+
+    if args.output.lower().endswith(".parquet"):
+        writer = ParquetResultWriter(args.output)
+    else:
+        writer = CSVResultWriter(args.output)
+
+    count = errors = 0
+    try:
+        for batch in chunked(price_all(scenarios, workers, args.chunk_size), args.chunk_size):
+            writer.write_batch(batch)
+            count += len(batch)
+            errors += sum(1 for row in batch if row["error"])
+    finally:
+        writer.close()
+
+    print(f"Priced {count} scenarios ({errors} with errors)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Regenerate internal and client report PDFs for many saved quotes.
+
+Quote definitions are JSON files in the format accepted by
+``reports.build_report_contexts``. The input is either a directory of
+``*.json`` definitions or a manifest listing one definition path per line
+(relative paths resolve against the manifest's directory).
+
+Each definition is priced with the current role master and rates and
+rendered through the report templates across a process pool. Every PDF is
+written to the output directory by its worker as soon as it finishes, and
+a summary of per-file timings and failures is printed at the end.
+
+    python batch_reports.py saved_quotes/ -o pdfs/ --workers 4 --summary summary.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from reports import REPORT_BACKENDS, REPORTS, build_report_contexts, render_report
+
+
+def find_definitions(source: str) -> list:
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if name.lower().endswith(".json")
+        )
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        return [
+            os.path.join(base, line.strip())
+            for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+def render_to_file(template_name: str, context: dict, out_path: str, backend: str = "pisa") -> dict:
+    # Runs in a worker: the PDF goes straight to disk instead of back to the parent
+    started = time.perf_counter()
+    try:
+        pdf_bytes = render_report(template_name, context, backend)
+        if pdf_bytes is None:
+            error = "pisa reported errors"
+        else:
+            with open(out_path, "wb") as f:
+                f.write(pdf_bytes)
+            error = None
+    except Exception as e:
+        pdf_bytes = None
+        error = f"{type(e).__name__}: {e}"
+
+    return {
+        "path": out_path,
+        "seconds": round(time.perf_counter() - started, 3),
+        "bytes": len(pdf_bytes) if pdf_bytes else 0,
+        "error": error,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render report PDFs for saved quote definitions.")
+    parser.add_argument("source", help="directory of quote definition .json files, or a manifest of paths")
+    parser.add_argument("-o", "--output-dir", default="reports_out", help="directory for the generated PDFs")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, default one per CPU")
+    parser.add_argument("--backend", choices=REPORT_BACKENDS, default="pisa", help="PDF rendering backend")
+    parser.add_argument("--only", choices=sorted(REPORTS), help="render only the internal or client report")
+    parser.add_argument("--summary", help="also write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    generated_on = datetime.now().strftime("%d %b %Y, %I:%M %p")
+    kinds = [args.only] if args.only else list(REPORTS)
+
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers or None) as executor:
+        futures = []
+        for path in find_definitions(args.source):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            try:
+                with open(path, encoding="utf-8") as f:
+                    definition = json.load(f)
+                contexts = dict(zip(("internal", "client"), build_report_contexts(definition, generated_on)))
+            except Exception as e:
+                results.append({"path": path, "seconds": 0.0, "bytes": 0, "error": f"{type(e).__name__}: {e}"})
+                continue
+
+            for kind in kinds:
+                template_name, suffix = REPORTS[kind]
+                out_path = os.path.join(args.output_dir, f"{stem} {suffix}.pdf")
+                futures.append(executor.submit(render_to_file, template_name, contexts[kind], out_path, args.backend))
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "FAILED " + result["error"] if result["error"] else f"{result['bytes']:,} bytes"
+            print(f"{result['seconds']:7.3f}s  {result['path']}  {status}", flush=True)
+
+    failures = [r for r in results if r["error"]]
+    summary = {
+        "files": len(results),
+        "failures": len(failures),
+        "seconds": round(time.perf_counter() - started, 3),
+        "results": results,
+    }
+    print(f"Rendered {len(results) - len(failures)}/{len(results)} PDFs in {summary['seconds']}s")
+    for failure in failures:
+        print(f"  failed: {failure['path']}: {failure['error']}")
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Compare the pisa and reportlab report backends.
+
+    python -m benchmarks.backends --rows 1,13,120 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.synthetic import synthetic_definition
+from reports import CLIENT_TEMPLATE, INTERNAL_TEMPLATE, REPORT_BACKENDS, build_report_contexts, render_report
+
+
+def time_render(template_name: str, context: dict, backend: str, repeat: int) -> float:
+    # One untimed render so font registration and template compilation are excluded
+    render_report(template_name, context, backend)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render_report(template_name, context, backend)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PDF rendering backends.")
+    parser.add_argument("--rows", default="1,13,120", help="comma-separated role row counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timed renders per case")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>5} {'report':<9} " + " ".join(f"{b:>10}" for b in REPORT_BACKENDS) + f" {'speedup':>8}")
+    for rows in (int(r) for r in args.rows.split(",")):
+        internal_context, client_context = build_report_contexts(synthetic_definition(rows), "01 Jan 2026, 10:00 AM")
+        for name, template_name, context in (
+                ("internal", INTERNAL_TEMPLATE, internal_context),
+                ("client", CLIENT_TEMPLATE, client_context),
+        ):
+            medians = {backend: time_render(template_name, context, backend, args.repeat) for backend in REPORT_BACKENDS}
+            speedup = medians["pisa"] / medians["reportlab"]
+            print(f"{rows:>5} {name:<9} " + " ".join(f"{medians[b] * 1000:>8.1f}ms" for b in REPORT_BACKENDS)
+                  + f" {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Time each stage of the quote pipeline on reproducible synthetic quotes.
+
+Stages: pricing, report context preparation, the two template renders,
+the two pisa conversions and base64 encoding of the PDFs. For every case
+and stage this records median wall and CPU time, the stage's peak Python
+allocations, its output size and the peak RSS of the whole process so far
+(a running maximum, not the stage's own peak), and writes them
+as JSON so runs from different commits can be compared:
+
+    python -m benchmarks.pipeline -o before.json
+    python -m benchmarks.pipeline -o after.json --compare before.json
+"""
+import argparse
+import base64
+import itertools
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import synthetic_definition
+from reports import (
+    CLIENT_TEMPLATE, INTERNAL_TEMPLATE, build_report_contexts, generate_pdf_from_html, get_template_env,
+    price_definition, warm_templates
+)
+
+GENERATED_ON = "01 Jan 2026, 10:00 AM"
+
+
+def pipeline_stages(definition: dict):
+    """Yield (stage, callable) pairs; each callable returns the stage output.
+
+    Later stages consume the output of earlier ones, computed once up front,
+    so every stage is timed in isolation.
+    """
+    env = get_template_env()
+    quote = price_definition(definition)
+    internal_context, client_context = build_report_contexts(definition, GENERATED_ON, quote)
+    internal_html = env.get_template(INTERNAL_TEMPLATE).render(**internal_context)
+    client_html = env.get_template(CLIENT_TEMPLATE).render(**client_context)
+    internal_pdf = generate_pdf_from_html(internal_html).getvalue()
+    client_pdf = generate_pdf_from_html(client_html).getvalue()
+
+    yield "pricing", lambda: price_definition(definition)
+    yield "contexts", lambda: build_report_contexts(definition, GENERATED_ON, quote)
+    yield "render_internal_html", lambda: env.get_template(INTERNAL_TEMPLATE).render(**internal_context)
+    yield "render_client_html", lambda: env.get_template(CLIENT_TEMPLATE).render(**client_context)
+    yield "pdf_internal", lambda: generate_pdf_from_html(internal_html).getvalue()
+    yield "pdf_client", lambda: generate_pdf_from_html(client_html).getvalue()
+    yield "base64", lambda: (base64.b64encode(internal_pdf), base64.b64encode(client_pdf))
+
+
+def output_size(output) -> int:
+    if isinstance(output, (bytes, str)):
+        return len(output)
+    if isinstance(output, tuple) and all(isinstance(o, (bytes, str)) for o in output):
+        return sum(len(o) for o in output)
+    return 0
+
+
+def measure(func, repeat: int) -> dict:
+    wall, cpu = [], []
+    output = None
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        output = func()
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() - cpu_start)
+
+    # Allocation tracing slows the code down, so it gets its own run
+    tracemalloc.start()
+    func()
+    peak_alloc = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "wall_ms": round(statistics.median(wall) * 1000, 3),
+        "cpu_ms": round(statistics.median(cpu) * 1000, 3),
+        # ru_maxrss is the peak of the whole process so far and never goes
+        # down, so this is a running maximum, not the stage's own peak.
+        # It is KiB on Linux and bytes on macOS.
+        "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        "peak_alloc_mb": round(peak_alloc / (1024 * 1024), 3),
+        "output_bytes": output_size(output),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["rows"], r["milestones"], r["description_words"], r["stage"]): r
+            for r in json.load(f)["results"]
+        }
+    print(f"\nWall time vs {baseline_path}:")
+    for r in results:
+        before = baseline.get((r["rows"], r["milestones"], r["description_words"], r["stage"]))
+        if before and before["wall_ms"]:
+            print(f"  {r['rows']:>4} rows {r['milestones']:>3} ms {r['description_words']:>4} words "
+                  f"{r['stage']:<22} {before['wall_ms']:>9.2f} -> {r['wall_ms']:>9.2f} ms "
+                  f"({r['wall_ms'] / before['wall_ms']:.2f}x)")
+
+
+def int_list(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the quote pipeline stage by stage.")
+    parser.add_argument("--rows", type=int_list, default=[1, 13, 100], help="role row counts")
+    parser.add_argument("--milestones", type=int_list, default=[1, 10], help="milestone counts")
+    parser.add_argument("--description-words", type=int_list, default=[10, 200], help="description lengths")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare wall times against")
+    args = parser.parse_args(argv)
+
+    warm_templates()
+    results = []
+    for rows, milestones, words in itertools.product(args.rows, args.milestones, args.description_words):
+        definition = synthetic_definition(rows, milestones, words)
+        for stage, func in pipeline_stages(definition):
+            result = {"rows": rows, "milestones": milestones, "description_words": words, "stage": stage}
+            result.update(measure(func, args.repeat))
+            results.append(result)
+            print(f"{rows:>4} rows {milestones:>3} ms {words:>4} words {stage:<22} "
+                  f"{result['wall_ms']:>9.2f} ms wall {result['cpu_ms']:>9.2f} ms cpu "
+                  f"{result['peak_alloc_mb']:>7.2f} MB alloc {result['output_bytes']:>9,} B", flush=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
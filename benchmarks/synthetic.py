@@ -0,0 +1,49 @@
+import random
+
+from rate_card import current_roles
+
+WORDS = (
+    "data pipeline ingestion model optimization dashboard api integration deployment "
+    "testing review forecasting scheduling routing warehouse migration training handover"
+).split()
+
+
+def synthetic_definition(role_rows: int, milestones: int = 3, description_words: int = 30,
+                         client_type: str = "IND", seed: int = 0) -> dict:
+    """A reproducible quote definition of the given size.
+
+    Role rows cycle through the role master, so more than 13 rows repeat
+    roles; pricing and rendering do not care.
+    """
+    rng = random.Random(seed)
+    role_names = list(current_roles())
+    percentages = [100 // milestones] * milestones if milestones else []
+    if percentages:
+        percentages[-1] += 100 - sum(percentages)
+
+    return {
+        "project_name": f"Benchmark {role_rows} roles",
+        "project_description": " ".join(rng.choice(WORDS) for _ in range(description_words)),
+        "client_type": client_type,
+        "overhead_factor": 1.4,
+        "margin_pct": 30,
+        "discount_pct": 5,
+        "roles": [
+            {
+                "role": role_names[i % len(role_names)],
+                "count": rng.randint(1, 5),
+                "hours": rng.randint(40, 1000)
+            }
+            for i in range(role_rows)
+        ],
+        "milestones": [
+            {
+                "name": f"Milestone {i + 1}",
+                "desc": " ".join(rng.choice(WORDS) for _ in range(description_words // 3)),
+                "pct": pct
+            }
+            for i, pct in enumerate(percentages)
+        ],
+        "user_doc": None,
+        "functional_doc": None,
+    }
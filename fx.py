@@ -0,0 +1,154 @@
+"""Exchange rates for pricing in foreign currencies.
+
+Rates are rupees per unit of a currency, e.g. ``{"USD": 91.01}``. They come
+from a pluggable source chosen with ``FX_SOURCE``:
+
+    static                  the built-in DEFAULT_RATES (the default)
+    /path/to/rates.json     a local file, {"rates": {"USD": 91.01, "EUR": 98.6}}
+    http://host/rates.json  an HTTP endpoint returning the same JSON
+
+and are cached for ``FX_TTL_SECONDS`` (default one hour).
+"""
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from typing import NamedTuple
+
+BASE_CURRENCY = "INR"
+
+# Rupees per unit, used by the static source and when the first fetch fails
+DEFAULT_RATES = {"USD": 91.01}
+
+logger = logging.getLogger(__name__)
+
+
+class FXRates(NamedTuple):
+    """Rupees per unit of each currency, as fetched from one source."""
+
+    rates: dict
+    source: str
+    fetched_at: float
+
+
+def parse_rates(data: bytes) -> dict:
+    rates = {code.upper(): float(rate) for code, rate in json.loads(data)["rates"].items()}
+    if not all(rate > 0 for rate in rates.values()):
+        raise ValueError("Exchange rates must be positive")
+    return rates
+
+
+class StaticRateSource:
+    name = "static"
+
+    def __init__(self, rates: dict):
+        self.rates = dict(rates)
+
+    def fetch(self) -> dict:
+        return dict(self.rates)
+
+
+class FileRateSource:
+    def __init__(self, path: str):
+        self.path = path
+        self.name = path
+
+    def fetch(self) -> dict:
+        with open(self.path, "rb") as f:
+            return parse_rates(f.read())
+
+
+class HTTPRateSource:
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+        self.name = url
+
+    def fetch(self) -> dict:
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            return parse_rates(response.read())
+
+
+def rate_source_from_env():
+    source = os.environ.get("FX_SOURCE") or "static"
+    if source == "static":
+        return StaticRateSource(DEFAULT_RATES)
+    if source.startswith(("http://", "https://")):
+        return HTTPRateSource(source, timeout=float(os.environ.get("FX_TIMEOUT_SECONDS", 5)))
+    return FileRateSource(source)
+
+
+class FXCache:
+    """Exchange rates from a rate source, cached for ``ttl`` seconds.
+
+    Once the rates are older than ``ttl``, ``rates()`` still returns them
+    straight away and fetches new ones on a background thread, so pricing
+    never waits on the source. Only the very first fetch blocks; if it fails,
+    DEFAULT_RATES stand in until a fetch succeeds. Failed fetches are logged
+    and retried after ``retry_interval`` seconds.
+    """
+
+    def __init__(self, source, ttl: float = 3600.0, retry_interval: float = 60.0):
+        self.source = source
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._rates = None
+        self._next_fetch = 0.0
+        self._refreshing = False
+
+    @classmethod
+    def from_env(cls):
+        return cls(rate_source_from_env(), ttl=float(os.environ.get("FX_TTL_SECONDS", 3600)))
+
+    def rates(self) -> FXRates:
+        if self._rates is None:
+            with self._lock:
+                if self._rates is None and not self._fetch():
+                    self._rates = FXRates({BASE_CURRENCY: 1.0, **DEFAULT_RATES}, "default", time.time())
+        elif time.monotonic() >= self._next_fetch:
+            with self._lock:
+                start = not self._refreshing and time.monotonic() >= self._next_fetch
+                self._refreshing = self._refreshing or start
+            if start:
+                threading.Thread(target=self._refresh, name="fx-refresh", daemon=True).start()
+        return self._rates
+
+    def rate(self, currency: str) -> float:
+        """Rupees per unit of ``currency``."""
+        rates = self.rates().rates
+        if currency not in rates:
+            raise ValueError(f"The exchange-rate source has no rate for {currency}")
+        return rates[currency]
+
+    def _refresh(self):
+        try:
+            self._fetch()
+        finally:
+            self._refreshing = False
+
+    def _fetch(self) -> bool:
+        try:
+            rates = self.source.fetch()
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning("Could not fetch exchange rates from %s: %s", self.source.name, e)
+            self._next_fetch = time.monotonic() + self.retry_interval
+            return False
+        self._rates = FXRates({**rates, BASE_CURRENCY: 1.0}, self.source.name, time.time())
+        self._next_fetch = time.monotonic() + self.ttl
+        return True
+
+
+_fx = None
+_fx_lock = threading.Lock()
+
+
+def get_fx() -> FXCache:
+    # One rate cache per process, configured from the environment
+    global _fx
+    with _fx_lock:
+        if _fx is None:
+            _fx = FXCache.from_env()
+        return _fx
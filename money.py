@@ -0,0 +1,103 @@
+"""Exact money arithmetic in integer minor units (paise, cents).
+
+Pricing multiplies hourly rates in floating point, but every amount that is
+added up, discounted or split is first rounded to whole minor units. From
+there on, everything is integer arithmetic, so totals never drift and the
+page, the reports and saved quotes show the same figures. Rounding is half
+to even everywhere, the same rule as the ``:,.0f`` display format. All
+functions take Python ints or NumPy int64 arrays and broadcast over arrays
+to work on whole batches.
+
+    split_milestones(230769.23, [30, 30, 40])  # [69231, 69231, 92307]
+"""
+import numpy as np
+
+# Both quote currencies (INR, USD) have 100 minor units
+MINOR_PER_UNIT = 100
+# Percentages are held in basis points, so 12.5% is 1250
+BASIS_POINTS = 10_000
+
+
+def to_minor(amounts):
+    """Round amounts in currency units to minor units: an int, or an int64 array."""
+    if isinstance(amounts, (int, float, np.number)):
+        # round() on a float is half to even, like np.rint
+        return round(float(amounts) * MINOR_PER_UNIT)
+    return np.rint(np.asarray(amounts, dtype=np.float64) * MINOR_PER_UNIT).astype(np.int64)
+
+
+def to_major(minor):
+    """Minor units back to currency units: a float, or a float array."""
+    if isinstance(minor, np.ndarray):
+        return minor / MINOR_PER_UNIT
+    return int(minor) / MINOR_PER_UNIT
+
+
+def to_basis_points(pcts):
+    if isinstance(pcts, (int, float, np.number)):
+        return round(float(pcts) * 100)
+    return np.rint(np.asarray(pcts, dtype=np.float64) * 100).astype(np.int64)
+
+
+def divide_half_even(numerator, denominator: int):
+    """Integer ``numerator / denominator`` rounded half to even, for a positive denominator."""
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    return quotient + ((twice > denominator) | ((twice == denominator) & (quotient % 2 == 1)))
+
+
+def percent_of(minor, pct):
+    """``pct`` percent of ``minor`` minor units, exactly rounded to a minor unit."""
+    return divide_half_even(minor * to_basis_points(pct), BASIS_POINTS)
+
+
+def allocate(totals, weights, denominator: int = None) -> np.ndarray:
+    """Split integer ``totals`` in proportion to integer ``weights`` by largest remainder.
+
+    Each share is first rounded down. The units left over then go one each to
+    the shares with the largest remainders, the earlier share first on ties.
+    The shares add up to the total exactly, and each is within one unit of
+    its exact proportion. ``denominator`` is the whole the weights are parts
+    of and defaults to their sum. Weights adding up to less than it leave the
+    rest unallocated.
+
+    ``totals`` may be a scalar or a 1-D array. The result has one row of
+    shares per total.
+    """
+    totals = np.asarray(totals, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.int64)
+    denominator = int(weights.sum()) if denominator is None else denominator
+    if denominator <= 0:
+        return np.zeros(totals.shape + weights.shape, dtype=np.int64)
+
+    # The remainder of the whole is an extra, unlisted share
+    rest = max(denominator - int(weights.sum()), 0)
+    parts = np.append(weights, rest)
+    exact = totals[..., None] * parts
+    shares, remainders = np.divmod(exact, denominator)
+    leftover = totals - shares.sum(axis=-1)
+
+    # Rank of every share's remainder within its row, largest first
+    order = np.argsort(-remainders, axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(parts.size), axis=-1)
+    shares += ranks < leftover[..., None]
+    return shares[..., :-1]
+
+
+def split_milestones(project_total: float, percentages) -> list:
+    """Whole-currency milestone amounts for ``percentages`` of ``project_total``.
+
+    The total is rounded to whole units as it is displayed, and split by
+    largest remainder. Milestones adding up to 100% sum exactly to the total.
+    Above 100% there is nothing to split, and each amount is simply its own
+    percentage of the total.
+    """
+    if not len(percentages):
+        return []
+    # Rounded once, straight to whole units, so it matches the displayed total
+    total_units = int(np.rint(project_total))
+    bps = to_basis_points(percentages)
+    if int(bps.sum()) > BASIS_POINTS:
+        return [int(amount) for amount in divide_half_even(total_units * bps, BASIS_POINTS)]
+    return [int(share) for share in allocate(total_units, bps, denominator=BASIS_POINTS)]
@@ -0,0 +1,42 @@
+import hashlib
+from io import BytesIO
+
+from startup import timed_import
+
+
+def attachment_cache_key(report_key: str, attachments: list) -> str:
+    # The report key already identifies the rendered PDF's content, and the
+    # upload hashes identify the attachments, so nothing has to be re-hashed.
+    payload = "\n".join([report_key, *(attachment["sha256"] for attachment in attachments)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_pdf(attachment: dict) -> bool:
+    # "readable" is set on upload; documents saved before that are assumed readable
+    return attachment["name"].lower().endswith(".pdf") and attachment.get("readable", True)
+
+
+def pdf_readable(path: str) -> bool:
+    """Whether pypdf can read the page tree of the file at ``path``."""
+    pypdf = timed_import("pypdf")
+    try:
+        return len(pypdf.PdfReader(path).pages) > 0
+    except Exception:
+        # Malformed files make pypdf fail in many different ways
+        return False
+
+
+def append_pdfs(report_pdf: bytes, paths: list) -> bytes:
+    """Return the report with the pages of the PDF files at ``paths`` appended.
+
+    Page objects are copied across as they are. Attachments are read from
+    disk on demand and their content streams are never decoded or re-rendered.
+    """
+    writer = timed_import("pypdf").PdfWriter()
+    writer.append(BytesIO(report_pdf))
+    for path in paths:
+        with open(path, "rb") as f:
+            writer.append(f, import_outline=False)
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
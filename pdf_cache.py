@@ -0,0 +1,21 @@
+import hashlib
+import json
+
+
+def _normalize(value):
+    # Uploaded files and other objects only matter to the report through
+    # their identity, never through their in-memory representation.
+    if hasattr(value, "name") and hasattr(value, "size"):
+        return {"name": value.name, "size": value.size}
+    return str(value)
+
+
+def make_cache_key(template_name: str, context: dict, backend: str = "pisa") -> str:
+    payload = json.dumps(
+        {"template": template_name, "backend": backend, "context": context},
+        sort_keys=True,
+        default=_normalize,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
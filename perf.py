@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class StageTimer:
+    """Durations (ms) and output sizes (bytes) of the stages of one script run.
+
+    ``lap(name)`` closes a stage that started at the previous lap, so a
+    top-level script can be instrumented with one call per section.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.durations = {}
+        self.sizes = {}
+
+    def lap(self, name: str):
+        now = time.perf_counter()
+        self.durations[name] = (now - self._last) * 1000
+        self._last = now
+
+    def record(self, name: str, seconds: float, size: int = None):
+        self.durations[name] = seconds * 1000
+        if size is not None:
+            self.sizes[name] = size
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self.started) * 1000
+
+
+class PerfRecorder:
+    """Rolling per-stage samples shared by all sessions, with periodic export.
+
+    ``export_path`` ending in ``.prom`` is rewritten in Prometheus text format;
+    any other path gets one JSON line appended per export. Exports happen at
+    most every ``export_interval`` seconds.
+    """
+
+    def __init__(self, window: int = 1000, export_path: str = None, export_interval: float = 15.0):
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._sizes = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            window=int(os.environ.get("PERF_WINDOW", 1000)),
+            export_path=os.environ.get("PERF_EXPORT_PATH") or None,
+            export_interval=float(os.environ.get("PERF_EXPORT_INTERVAL", 15))
+        )
+
+    def add(self, stage: str, duration_ms: float, size: int = None):
+        with self._lock:
+            self._durations[stage].append(duration_ms)
+            self._counts[stage] += 1
+            if size is not None:
+                self._sizes[stage].append(size)
+
+    def add_timer(self, timer: StageTimer, total_stage: str = "rerun_total"):
+        for stage, duration_ms in timer.durations.items():
+            self.add(stage, duration_ms, timer.sizes.get(stage))
+        self.add(total_stage, timer.total_ms)
+        self.maybe_export()
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._durations.items()}
+            sizes = {stage: list(values) for stage, values in self._sizes.items()}
+            counts = dict(self._counts)
+
+        summary = {}
+        for stage, values in samples.items():
+            quantiles = np.percentile(values, PERCENTILES)
+            summary[stage] = {
+                "count": counts[stage],
+                **{f"p{p}_ms": round(float(q), 3) for p, q in zip(PERCENTILES, quantiles)},
+            }
+            if sizes.get(stage):
+                summary[stage]["p50_bytes"] = int(np.percentile(sizes[stage], 50))
+        return summary
+
+    def maybe_export(self):
+        if not self.export_path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_export < self.export_interval:
+                return
+            self._last_export = now
+        self.export(self.export_path)
+
+    def export(self, path: str):
+        summary = self.summary()
+        if path.endswith(".prom"):
+            # Rewritten atomically so a scraper never reads a partial file
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(prometheus_text(summary))
+            os.replace(tmp_path, path)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"timestamp": time.time(), "stages": summary}) + "\n")
+
+
+def prometheus_text(summary: dict) -> str:
+    lines = [
+        "# HELP quote_stage_duration_ms Duration of quotation page stages over the rolling window.",
+        "# TYPE quote_stage_duration_ms summary",
+    ]
+    for stage, stats in sorted(summary.items()):
+        for p in PERCENTILES:
+            lines.append(f'quote_stage_duration_ms{{stage="{stage}",quantile="{p / 100}"}} {stats[f"p{p}_ms"]}')
+        lines.append(f'quote_stage_duration_ms_count{{stage="{stage}"}} {stats["count"]}')
+    lines.append("# HELP quote_stage_output_bytes Median output size of quotation page stages.")
+    lines.append("# TYPE quote_stage_output_bytes gauge")
+    for stage, stats in sorted(summary.items()):
+        if "p50_bytes" in stats:
+            lines.append(f'quote_stage_output_bytes{{stage="{stage}"}} {stats["p50_bytes"]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,219 @@
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from fx import get_fx
+from money import percent_of, to_major, to_minor
+from rate_card import current_roles
+
+HOURS_PER_YEAR = 2080
+
+# Defaults of the calculator page controls
+DEFAULT_OVERHEAD_FACTOR = 1.4
+DEFAULT_MARGIN_PCT = 30
+MARGIN_OPTIONS = (10, 20, 30, 40, 50)
+
+# ================== CLIENT TYPES ==================
+# Prices are quoted in the client's currency at the current rate of fx.get_fx()
+CLIENT_TYPES = {
+    "IND": {"currency_symbol": "₹", "currency": "INR", "margin_divisor": 0.7},
+    "USA": {"currency_symbol": "$", "currency": "USD", "margin_divisor": 0.5},
+}
+
+
+def fx_rate_for(client_type: str) -> float:
+    """Rupees per unit of the client type's currency, at the current exchange rate."""
+    return get_fx().rate(CLIENT_TYPES[client_type]["currency"])
+
+
+class QuoteResult(NamedTuple):
+    """Per-row figures (NumPy arrays, one entry per line item) and quote totals."""
+
+    comp: np.ndarray
+    emp: np.ndarray
+    overhead: np.ndarray
+    margin: np.ndarray
+    total_hours: np.ndarray
+    internal_cost: np.ndarray
+    final_amount: np.ndarray
+    margin_amount: np.ndarray
+    total_internal: float
+    total_final: float
+    total_margin: float
+    total_duration: int
+    total_resource: int
+    discount_amount: float
+    final_after_discount: float
+
+
+# Per-line-item array fields and scalar total fields of a QuoteResult
+ROW_FIELDS = QuoteResult._fields[:8]
+TOTAL_FIELDS = QuoteResult._fields[8:]
+
+
+class RateTable(NamedTuple):
+    """Per-hour figures of every role for one client type, exchange rate and overhead factor.
+
+    Row 0 is an all-zero row for empty roles; ``index`` maps role names to rows.
+    """
+
+    index: dict
+    comp: np.ndarray
+    emp: np.ndarray
+    overhead: np.ndarray
+    margin: np.ndarray
+
+
+_rate_tables = OrderedDict()
+_rate_tables_lock = threading.Lock()
+RATE_TABLE_CACHE_SIZE = 64
+
+
+def rate_table(role_master: dict, client_type: str, overhead_factor: float, fx_rate: float) -> RateTable:
+    """Memoized rate table, built on first use per role master, client type, rate and overhead.
+
+    The margin % only scales the line totals, so it is not part of the key.
+    Role masters are keyed by identity and must not be mutated once used; the
+    rate card hands out a new dict on every reload.
+    """
+    key = (id(role_master), client_type, overhead_factor, fx_rate)
+    with _rate_tables_lock:
+        cached = _rate_tables.get(key)
+        if cached is not None and cached[0] is role_master:
+            _rate_tables.move_to_end(key)
+            return cached[1]
+
+    client = CLIENT_TYPES[client_type]
+    annual_comp = np.array([0.0] + [spec["comp"] for spec in role_master.values()], dtype=np.float64)
+    comp = annual_comp * (1 / fx_rate)
+    emp = comp / HOURS_PER_YEAR
+    overhead = emp * overhead_factor
+    table = RateTable(
+        index={role: row for row, role in enumerate(role_master, start=1)},
+        comp=comp,
+        emp=emp,
+        overhead=overhead,
+        margin=overhead / client["margin_divisor"]
+    )
+
+    with _rate_tables_lock:
+        # The role master is kept with its table so its id cannot be reused meanwhile
+        _rate_tables[key] = (role_master, table)
+        if len(_rate_tables) > RATE_TABLE_CACHE_SIZE:
+            _rate_tables.popitem(last=False)
+    return table
+
+
+def price_items(roles, counts, hours, overhead_factor: float, margin_pct: float,
+                discount_pct: float = 0, client_type: str = "IND", role_master: dict = None,
+                fx_rate: float = None) -> QuoteResult:
+    """Price a batch of line items in one vectorized pass.
+
+    ``roles``, ``counts`` and ``hours`` are parallel sequences; an empty role
+    prices at zero but its count and hours still add to the totals, as in the
+    Team Structure grid. ``fx_rate`` is rupees per unit of the client type's
+    currency and defaults to the current rate.
+    """
+    role_master = current_roles() if role_master is None else role_master
+    fx_rate = fx_rate_for(client_type) if fx_rate is None else fx_rate
+    rates = rate_table(role_master, client_type, overhead_factor, fx_rate)
+    margin_factor = 1 - margin_pct / 100
+
+    # Per-hour figures are looked up, not recomputed per row
+    rows = np.fromiter((rates.index[role] if role else 0 for role in roles), dtype=np.intp, count=len(roles))
+    counts = np.asarray(counts, dtype=np.int64)
+    hours = np.asarray(hours, dtype=np.int64)
+
+    comp = rates.comp[rows]
+    emp = rates.emp[rows]
+    overhead = rates.overhead[rows]
+    margin = rates.margin[rows]
+    total_hours = counts * hours
+
+    # Line amounts are rounded to minor units, so the totals, the discount
+    # and later the milestone split are exact integer sums of them. The three
+    # amounts are written into one array to round and add them up in one pass.
+    amounts = np.empty((3, len(rows)))
+    np.multiply(total_hours, emp, out=amounts[0])
+    np.multiply(total_hours, overhead, out=amounts[1])
+    np.divide(amounts[1], margin_factor, out=amounts[2])
+    amounts = to_minor(amounts)
+    total_internal, total_final, total_margin = amounts.sum(axis=1).tolist()
+    internal_cost, final_amount, margin_amount = to_major(amounts)
+    discount_amount = percent_of(total_margin, discount_pct)
+
+    return QuoteResult(
+        comp=comp,
+        emp=emp,
+        overhead=overhead,
+        margin=margin,
+        total_hours=total_hours,
+        internal_cost=internal_cost,
+        final_amount=final_amount,
+        margin_amount=margin_amount,
+        total_internal=to_major(total_internal),
+        total_final=to_major(total_final),
+        total_margin=to_major(total_margin),
+        total_duration=int(total_hours.sum()),
+        total_resource=int(counts.sum()),
+        discount_amount=to_major(discount_amount),
+        final_after_discount=to_major(total_margin - discount_amount)
+    )
+
+
+class ScenarioGrid(NamedTuple):
+    """Quote totals of one team over a grid of pricing parameters.
+
+    Arrays are indexed in argument order: ``final_after_discount[c, o, m, d]``
+    is for client type c, overhead factor o, margin m and discount d.
+    """
+
+    client_types: tuple
+    overhead_factors: np.ndarray
+    margin_pcts: np.ndarray
+    discount_pcts: np.ndarray
+    total_internal: np.ndarray
+    total_final: np.ndarray
+    total_margin: np.ndarray
+    final_after_discount: np.ndarray
+
+
+def price_grid(roles, counts, hours, client_types, overhead_factors, margin_pcts, discount_pcts,
+               role_master: dict = None, fx_rates: dict = None) -> ScenarioGrid:
+    """Price one team for every combination of the given parameters in one
+    broadcast pass, with the formulas of price_items. ``fx_rates`` maps client
+    types to rates and defaults to the current ones."""
+    role_master = current_roles() if role_master is None else role_master
+    fx_rates = fx_rates or {}
+    overhead_factors = np.asarray(overhead_factors, dtype=np.float64)
+    margin_pcts = np.asarray(margin_pcts, dtype=np.float64)
+    discount_pcts = np.asarray(discount_pcts, dtype=np.float64)
+    total_hours = np.asarray(counts, dtype=np.int64) * np.asarray(hours, dtype=np.int64)
+
+    # Per-hour employee cost of every row, one line per client type
+    emp = []
+    for client_type in client_types:
+        fx_rate = fx_rates.get(client_type) or fx_rate_for(client_type)
+        rates = rate_table(role_master, client_type, DEFAULT_OVERHEAD_FACTOR, fx_rate)
+        emp.append(rates.emp[[rates.index[role] if role else 0 for role in roles]])
+    emp = np.array(emp, dtype=np.float64).reshape(len(client_types), len(total_hours))
+
+    # Axes: client type, overhead, margin, discount, then line item; amounts
+    # are rounded to minor units per line, as in price_items
+    final_amount = total_hours * (emp[:, None, :] * overhead_factors[None, :, None])
+    margin_amount = to_minor(final_amount[:, :, None, :] / (1 - margin_pcts / 100)[None, None, :, None])
+    total_margin = margin_amount.sum(axis=-1)
+    discount_amount = percent_of(total_margin[..., None], discount_pcts)
+
+    return ScenarioGrid(
+        client_types=tuple(client_types),
+        overhead_factors=overhead_factors,
+        margin_pcts=margin_pcts,
+        discount_pcts=discount_pcts,
+        total_internal=to_major(to_minor(total_hours * emp).sum(axis=-1)),
+        total_final=to_major(to_minor(final_amount).sum(axis=-1)),
+        total_margin=to_major(total_margin),
+        final_after_discount=to_major(total_margin[..., None] - discount_amount)
+    )
@@ -0,0 +1,121 @@
+import numpy as np
+
+from money import percent_of, to_major, to_minor
+from pricing import ROW_FIELDS, QuoteResult, price_items
+
+
+class QuoteModel:
+    """Per-session pricing state that only re-prices rows whose inputs changed.
+
+    Every row's figures are kept between reruns. ``update`` re-prices the
+    rows whose role, count or hours changed and adjusts the running totals
+    by their deltas; a change to a global factor (overhead, margin, client
+    type, exchange rate or role master) re-prices every row. The discount only applies to
+    the total, so changing it costs nothing per row. Money totals are kept in
+    integer minor units, so no number of edits makes them drift from a fresh
+    ``price_items``.
+    """
+
+    def __init__(self):
+        self._params = None
+        self._role_master = None
+        self._inputs = []
+        self._rows = {field: np.zeros(0) for field in ROW_FIELDS}
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._totals = {}
+        self.last_repriced = 0
+
+    def update(self, roles, counts, hours, overhead_factor: float, margin_pct: float,
+               discount_pct: float = 0, client_type: str = "IND", role_master: dict = None,
+               fx_rate: float = None) -> QuoteResult:
+        inputs = [(role or "", int(count), int(hour)) for role, count, hour in zip(roles, counts, hours)]
+        params = (overhead_factor, margin_pct, client_type, fx_rate)
+
+        # The role master itself is kept and compared by identity; an id alone
+        # could be reused by a reloaded rate card once the old dict is freed
+        if params != self._params or role_master is not self._role_master:
+            self._price_all(inputs, params, role_master)
+        else:
+            self._price_changed(inputs, role_master)
+
+        total_margin = self._totals["margin"]
+        discount_amount = percent_of(total_margin, discount_pct)
+        return QuoteResult(
+            **{field: self._rows[field] for field in ROW_FIELDS},
+            total_internal=to_major(self._totals["internal"]),
+            total_final=to_major(self._totals["final"]),
+            total_margin=to_major(total_margin),
+            total_duration=self._totals["duration"],
+            total_resource=self._totals["resource"],
+            discount_amount=to_major(discount_amount),
+            final_after_discount=to_major(total_margin - discount_amount)
+        )
+
+    def _price(self, inputs: list, role_master: dict) -> QuoteResult:
+        overhead_factor, margin_pct, client_type, fx_rate = self._params
+        roles, counts, hours = zip(*inputs) if inputs else ((), (), ())
+        return price_items(
+            list(roles), list(counts), list(hours),
+            overhead_factor=overhead_factor,
+            margin_pct=margin_pct,
+            client_type=client_type,
+            role_master=role_master,
+            fx_rate=fx_rate
+        )
+
+    def _price_all(self, inputs: list, params: tuple, role_master: dict):
+        self._params = params
+        self._role_master = role_master
+        self._inputs = inputs
+        quote = self._price(inputs, role_master)
+        self._rows = {field: getattr(quote, field).copy() for field in ROW_FIELDS}
+        self._counts = np.array([count for _, count, _ in inputs], dtype=np.int64)
+        self._totals = {
+            "internal": to_minor(quote.total_internal),
+            "final": to_minor(quote.total_final),
+            "margin": to_minor(quote.total_margin),
+            "duration": quote.total_duration,
+            "resource": quote.total_resource,
+        }
+        self.last_repriced = len(inputs)
+
+    def _price_changed(self, inputs: list, role_master: dict):
+        old_len, new_len = len(self._inputs), len(inputs)
+        dirty = [
+            i for i in range(new_len)
+            if i >= old_len or self._inputs[i] != inputs[i]
+        ]
+
+        # Rows that were removed or are about to be re-priced leave the totals
+        for i in dirty + list(range(new_len, old_len)):
+            if i < old_len:
+                self._add_row_to_totals(i, -1)
+
+        if new_len != old_len:
+            for field in ROW_FIELDS:
+                self._rows[field] = self._resized(self._rows[field], new_len)
+            self._counts = self._resized(self._counts, new_len)
+
+        if dirty:
+            quote = self._price([inputs[i] for i in dirty], role_master)
+            for field in ROW_FIELDS:
+                self._rows[field][dirty] = getattr(quote, field)
+            self._counts[dirty] = [inputs[i][1] for i in dirty]
+            for i in dirty:
+                self._add_row_to_totals(i, 1)
+
+        self._inputs = inputs
+        self.last_repriced = len(dirty)
+
+    def _add_row_to_totals(self, i: int, sign: int):
+        self._totals["internal"] += sign * to_minor(self._rows["internal_cost"][i])
+        self._totals["final"] += sign * to_minor(self._rows["final_amount"][i])
+        self._totals["margin"] += sign * to_minor(self._rows["margin_amount"][i])
+        self._totals["duration"] += sign * int(self._rows["total_hours"][i])
+        self._totals["resource"] += sign * int(self._counts[i])
+
+    @staticmethod
+    def _resized(values: np.ndarray, length: int) -> np.ndarray:
+        resized = np.zeros(length, dtype=values.dtype)
+        resized[:min(length, len(values))] = values[:length]
+        return resized
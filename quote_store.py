@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from money import split_milestones
+from pricing import TOTAL_FIELDS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    project_name TEXT NOT NULL COLLATE NOCASE,
+    client_type TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    total_amount REAL NOT NULL,
+    definition TEXT NOT NULL,
+    totals TEXT NOT NULL,
+    milestone_split TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_project_name ON quotes (project_name);
+CREATE INDEX IF NOT EXISTS quotes_client_type ON quotes (client_type, created_at);
+CREATE INDEX IF NOT EXISTS quotes_created_at ON quotes (created_at);
+CREATE INDEX IF NOT EXISTS quotes_total_amount ON quotes (total_amount);
+
+CREATE TABLE IF NOT EXISTS quote_pdfs (
+    quote_id INTEGER NOT NULL REFERENCES quotes (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    pdf BLOB NOT NULL,
+    PRIMARY KEY (quote_id, kind)
+);
+"""
+
+
+class QuoteStore:
+    """Saved quotes in a local SQLite database.
+
+    A quote is stored with its definition (the inputs), its totals, its
+    milestone split and optionally the rendered PDFs. Listing only reads
+    the indexed summary columns, so it stays fast with many stored quotes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("QUOTE_DB_PATH") or os.path.join(BASE_DIR, "quotes.db"))
+
+    def save(self, definition: dict, quote, pdfs: dict = None) -> int:
+        """Store a quote and return its id. ``pdfs`` maps report kind to PDF bytes."""
+        totals = {field: float(getattr(quote, field)) for field in TOTAL_FIELDS}
+        milestones = definition.get("milestones") or []
+        milestone_split = split_milestones(quote.final_after_discount, [m["pct"] for m in milestones])
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO quotes (project_name, client_type, created_at, total_amount, definition, totals,"
+                " milestone_split) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    definition.get("project_name", ""),
+                    definition.get("client_type", "IND"),
+                    datetime.now().isoformat(timespec="seconds"),
+                    totals["final_after_discount"],
+                    json.dumps(definition),
+                    json.dumps(totals),
+                    json.dumps(milestone_split)
+                )
+            )
+            quote_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO quote_pdfs (quote_id, kind, sha256, pdf) VALUES (?, ?, ?, ?)",
+                [
+                    (quote_id, kind, hashlib.sha256(pdf).hexdigest(), pdf)
+                    for kind, pdf in (pdfs or {}).items() if pdf
+                ]
+            )
+        return quote_id
+
+    def list(self, name_prefix: str = "", client_type: str = None, since: str = None, until: str = None,
+             min_total: float = None, max_total: float = None, limit: int = 50, offset: int = 0) -> list:
+        """Summaries of stored quotes, newest first. Dates are ISO strings."""
+        conditions, params = [], []
+        if name_prefix:
+            conditions.append("project_name LIKE ? ESCAPE '\\'")
+            params.append(name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        for condition, value in (
+                ("client_type = ?", client_type),
+                ("created_at >= ?", since),
+                ("created_at < ?", until),
+                ("total_amount >= ?", min_total),
+                ("total_amount <= ?", max_total),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, project_name, client_type, created_at, total_amount FROM quotes "
+                f"{where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def load(self, quote_id: int):
+        """The full stored quote, or None if there is no such id."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM quotes WHERE id = ?", (quote_id,)).fetchone()
+            if row is None:
+                return None
+            pdfs = self._conn.execute(
+                "SELECT kind, sha256 FROM quote_pdfs WHERE quote_id = ?", (quote_id,)
+            ).fetchall()
+        quote = dict(row)
+        for field in ("definition", "totals", "milestone_split"):
+            quote[field] = json.loads(quote[field])
+        quote["pdfs"] = {kind: sha256 for kind, sha256 in pdfs}
+        return quote
+
+    def pdf(self, quote_id: int, kind: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pdf FROM quote_pdfs WHERE quote_id = ? AND kind = ?", (quote_id, kind)
+            ).fetchone()
+        return row["pdf"] if row else None
+
+    def delete(self, quote_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM quotes WHERE id = ?", (quote_id,))
@@ -0,0 +1,93 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RATE_CARD_PATH = os.environ.get("RATE_CARD_PATH") or os.path.join(BASE_DIR, "rate_card.json")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate_card(path: str, data: bytes) -> dict:
+    """Role master from a rate-card file: JSON ``{"roles": {role: {"comp": ...}}}``
+    or CSV with ``role`` and ``comp`` columns."""
+    if path.lower().endswith(".csv"):
+        rows = csv.DictReader(data.decode("utf-8-sig").splitlines())
+        roles = {row["role"].strip(): {"comp": float(row["comp"])} for row in rows if row.get("role", "").strip()}
+    else:
+        roles = {role: {"comp": float(spec["comp"])} for role, spec in json.loads(data)["roles"].items()}
+    if not roles:
+        raise ValueError(f"{path} defines no roles")
+    # Whole-number salaries stay ints so figures print as before
+    for spec in roles.values():
+        if spec["comp"].is_integer():
+            spec["comp"] = int(spec["comp"])
+    return roles
+
+
+class RateCard:
+    """The role master of a rate-card file, reloaded when the file changes.
+
+    ``roles()`` stats the file at most every ``check_interval`` seconds and
+    re-reads it when its mtime or size changed. Each load produces a new
+    dict, so callers that key on the role master's identity, such as
+    ``pricing.rate_table`` and ``QuoteModel``, pick up new rates on their own.
+    A file that fails to parse is logged, and the last good rates stay in use.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._roles = None
+        self._stat = None
+        self._checked = 0.0
+        self.digest = None
+        self._reload()
+
+    def roles(self) -> dict:
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            with self._lock:
+                if now - self._checked >= self.check_interval:
+                    self._checked = now
+                    self._reload()
+        return self._roles
+
+    def _reload(self):
+        try:
+            stat = os.stat(self.path)
+            if self._roles is not None and (stat.st_mtime_ns, stat.st_size) == self._stat:
+                return
+            with open(self.path, "rb") as f:
+                data = f.read()
+            roles = parse_rate_card(self.path, data)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if self._roles is None:
+                raise
+            logger.warning("Keeping the previous rate card, %s could not be loaded: %s", self.path, e)
+            return
+        self._roles = roles
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+        self.digest = hashlib.sha256(data).hexdigest()
+
+
+_rate_card = None
+_rate_card_lock = threading.Lock()
+
+
+def get_rate_card() -> RateCard:
+    # One rate card per process, read from RATE_CARD_PATH
+    global _rate_card
+    with _rate_card_lock:
+        if _rate_card is None:
+            _rate_card = RateCard(RATE_CARD_PATH)
+        return _rate_card
+
+
+def current_roles() -> dict:
+    return get_rate_card().roles()
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from reports import render_report_timed
+from startup import prewarm
+
+
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _bare_main():
+    # A spawned process re-runs the parent's __main__ before it does anything
+    # else. Under `streamlit run` that is app.py, i.e. the whole page. Workers
+    # only need the reports module, so they are started while __main__ is a
+    # bare module they have nothing to re-run from. Streamlit installs a new
+    # __main__ on every rerun, so one set meanwhile is left in place.
+    with _main_lock:
+        main = sys.modules["__main__"]
+        bare = sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            if sys.modules["__main__"] is bare:
+                sys.modules["__main__"] = main
+
+
+class RenderQueueFull(Exception):
+    """Raised when a render job would exceed the global or per-session queue depth."""
+
+
+class RenderService:
+    """Renders report PDFs in a pool of worker processes.
+
+    xhtml2pdf and reportlab are CPU-bound and hold the GIL, so rendering runs
+    in separate processes and callers get a ``concurrent.futures.Future``
+    resolving to ``(pdf_bytes, timings)`` as returned by
+    ``reports.render_report_timed``; ``pdf_bytes`` is None when pisa reports
+    an error.
+
+    ``max_pending`` bounds the jobs queued or running across all sessions and
+    ``max_pending_per_session`` the jobs of a single session, so one heavy
+    session cannot starve the others.
+    """
+
+    def __init__(self, max_workers: int = None, max_pending: int = 8, max_pending_per_session: int = 2):
+        # spawn: Streamlit runs sessions on threads, which fork does not mix well with
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=prewarm
+        )
+        self.max_pending = max_pending
+        self.max_pending_per_session = max_pending_per_session
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pending_by_session = Counter()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_workers=int(os.environ.get("RENDER_WORKERS", 0)) or None,
+            max_pending=int(os.environ.get("RENDER_MAX_PENDING", 8)),
+            max_pending_per_session=int(os.environ.get("RENDER_MAX_PENDING_PER_SESSION", 2))
+        )
+
+    def submit(self, template_name: str, context: dict, session_id: str = None, backend: str = "pisa"):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise RenderQueueFull("Too many reports are being rendered, please retry shortly")
+            if session_id is not None and self._pending_by_session[session_id] >= self.max_pending_per_session:
+                raise RenderQueueFull("Reports for this session are still being rendered")
+            self._pending += 1
+            if session_id is not None:
+                self._pending_by_session[session_id] += 1
+
+        try:
+            # The pool starts its workers on submit, as they are needed
+            with _bare_main():
+                future = self._executor.submit(render_report_timed, template_name, context, backend)
+        except Exception:
+            self._release(session_id)
+            raise
+
+        future.add_done_callback(lambda _: self._release(session_id))
+        return future
+
+    def _release(self, session_id):
+        with self._lock:
+            self._pending -= 1
+            if session_id is not None:
+                self._pending_by_session[session_id] -= 1
+                if self._pending_by_session[session_id] <= 0:
+                    del self._pending_by_session[session_id]
+
+    def pending(self, session_id: str = None) -> int:
+        with self._lock:
+            if session_id is None:
+                return self._pending
+            return self._pending_by_session[session_id]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,236 @@
+"""Draw the quotation reports directly with reportlab platypus.
+
+A faster alternative to laying the HTML templates out with pisa. The
+functions take the same context dicts as ``internal_report.html`` and
+``client_report.html`` and produce the same sections: header logo, project
+details, roles table, milestone table, totals and uploaded documents.
+"""
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from xml.sax.saxutils import escape
+
+from assets import FONT_NAME, logo_png, register_fonts
+from reports import CLIENT_TEMPLATE, INTERNAL_TEMPLATE
+
+ABOUT_US_TITLE = "An Industry Leading Provider of AI & Optimization Solutions."
+ABOUT_US = (
+    'ORMAE delivers "cutting-edge, cost-effective Optimization & Data Science solutions" in diverse business '
+    "domains with direct impact on Revenues. We have helped 45+ clients across the globe including USA, Europe, "
+    "Middle-East & APAC. We serve large, mid & small enterprises including startups, with majority of our clients "
+    "being market leaders and unicorns. Our solutions are tailored to customer needs and able to solve the most "
+    "complex business process optimization satisfying all operational constraints. Our solution development and "
+    "implementation team are both skilled at software development and business domain knowledge. Our solutions "
+    "have already made an impact of saving millions of dollars in operational business processes of more than a "
+    "billion dollar sized organizations. We are among the few global companies who has all the three analytical "
+    "pillars-Data Science, Optimization and Advanced Analytics under the same umbrella and can provide a "
+    "holistic Optimization & Data Science solution."
+)
+
+# 35px high and at most 110px wide in the HTML templates
+LOGO_HEIGHT = 35 * 0.75
+LOGO_MAX_WIDTH = 110 * 0.75
+HEADER_GREY = colors.HexColor("#e5e7eb")
+TITLE_BLUE = colors.HexColor("#1f3a8a")
+HEADING_BLUE = colors.HexColor("#1e40af")
+TOTAL_GREEN = colors.HexColor("#16a34a")
+
+
+def _styles(font_size: float, cell_size: float = 8, heading_color=colors.black):
+    return {
+        "title": ParagraphStyle("title", fontName=FONT_NAME, fontSize=30, leading=36, alignment=TA_CENTER),
+        "heading": ParagraphStyle("heading", fontName=FONT_NAME, fontSize=14, leading=18,
+                                  spaceBefore=6, spaceAfter=3, textColor=heading_color),
+        "body": ParagraphStyle("body", fontName=FONT_NAME, fontSize=font_size, leading=font_size * 1.3),
+        "cell": ParagraphStyle("cell", fontName=FONT_NAME, fontSize=cell_size, leading=cell_size * 1.2,
+                               alignment=TA_CENTER),
+        "right": ParagraphStyle("right", fontName=FONT_NAME, fontSize=11, leading=14, alignment=TA_RIGHT),
+    }
+
+
+def _money(context: dict, value) -> str:
+    return f"{context['currency_symbol']}{value:,.0f}"
+
+
+def _logo(align: str):
+    image = Image(BytesIO(logo_png()), width=LOGO_MAX_WIDTH, height=LOGO_HEIGHT, kind="proportional")
+    image.hAlign = align
+    return image
+
+
+def _grid(rows: list, col_widths: list, font_size: float = 8):
+    table = Table(rows, colWidths=col_widths, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("FONT", (0, 0), (-1, -1), FONT_NAME, font_size),
+        ("GRID", (0, 0), (-1, -1), 0.75, colors.HexColor("#333333")),
+        ("BACKGROUND", (0, 0), (-1, 0), HEADER_GREY),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 2),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+    ]))
+    return table
+
+
+def _about_us(styles) -> list:
+    return [
+        Paragraph("About Us:", styles["heading"]),
+        Paragraph(f"<b>{escape(ABOUT_US_TITLE)}</b>", styles["body"]),
+        Paragraph(escape(ABOUT_US), styles["body"]),
+    ]
+
+
+def _uploaded_documents(context: dict, styles, heading: str) -> list:
+    def status(doc):
+        if doc:
+            return '<font color="green">Uploaded</font>'
+        return '<font color="red">Not Uploaded</font>'
+
+    return [
+        Paragraph(heading, styles["heading"]),
+        Paragraph(f"<b>User Requirement Doc:</b> {status(context.get('user_doc'))}", styles["body"]),
+        Paragraph(f"<b>Functional Requirement Doc:</b> {status(context.get('functional_doc'))}", styles["body"]),
+    ]
+
+
+def _build(story: list) -> bytes:
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=15 * mm,
+        rightMargin=15 * mm,
+        topMargin=12 * mm,
+        bottomMargin=12 * mm
+    )
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_client_report(context: dict) -> bytes:
+    register_fonts()
+    styles = _styles(9, cell_size=10)
+    width = A4[0] - 30 * mm
+    story = [_logo("RIGHT"), Spacer(1, 4 * mm), Paragraph("Quotation Report", styles["title"])]
+    story += _about_us(styles)
+
+    story.append(Paragraph("1. Team Structure:", styles["heading"]))
+    story.append(Paragraph(f"<b>Project Name:</b> {escape(context['project_name'])}", styles["body"]))
+    if context.get("project_description"):
+        story.append(Paragraph(f"<b>Description:</b> {escape(context['project_description'])}", styles["body"]))
+    story.append(Paragraph(f"<b>Total Resources:</b> {context['total_manpower']}", styles["body"]))
+    story.append(Paragraph(
+        f"<b>Timeline:</b> {context['total_project_hours']} Hrs (<b>{context['total_project_days']} Days</b>)",
+        styles["body"]
+    ))
+    story.append(Spacer(1, 3 * mm))
+
+    rows = [["Count", "Hours", "Total Amount"]]
+    rows += [[row["Count"], row["Hours"], _money(context, row["Margin_Amount"])] for row in context["roles_data"]]
+    story.append(_grid(rows, [0.08 * width, 0.08 * width, 0.84 * width], font_size=10))
+
+    if context.get("milestone_data"):
+        story.append(Paragraph("Milestone Breakdown", styles["heading"]))
+        rows = [["Milestone Name", "Description", "Percentage %", "Amount"]]
+        rows += [
+            [Paragraph(escape(m["Name"]), styles["cell"]), m.get("Date") or "-", m["Percentage"],
+             _money(context, m["Amount"])]
+            for m in context["milestone_data"]
+        ]
+        story.append(_grid(rows, [0.35 * width, 0.2 * width, 0.15 * width, 0.3 * width], font_size=10))
+
+    story.append(Spacer(1, 5 * mm))
+    if context["discount_pct"] > 0:
+        story.append(Paragraph(f"<b>Discount:</b> {context['discount_pct']}%", styles["body"]))
+        story.append(Paragraph(
+            f"<b>Discounted Amount:</b> {_money(context, context['discount_amount'])}",
+            styles["body"]
+        ))
+    if context.get("exchange_rate"):
+        story.append(Paragraph(f"<b>Exchange Rate:</b> {escape(context['exchange_rate'])}", styles["body"]))
+    story.append(Paragraph(
+        f"<b>Final Amount:</b> {_money(context, context['final_after_discount'])}",
+        ParagraphStyle("final", parent=styles["body"], fontSize=15, leading=20)
+    ))
+
+    story += _uploaded_documents(context, styles, "2. Uploaded Documents:")
+    return _build(story)
+
+
+def render_internal_report(context: dict) -> bytes:
+    register_fonts()
+    styles = _styles(8, heading_color=HEADING_BLUE)
+    styles["title"].textColor = TITLE_BLUE
+    width = A4[0] - 30 * mm
+    story = [
+        _logo("CENTER"),
+        Spacer(1, 4 * mm),
+        Paragraph("Quotation Report", styles["title"]),
+        Paragraph(f"<b>{escape(context['generated_on'])}</b>", styles["right"]),
+    ]
+    story += _about_us(styles)
+
+    story.append(Paragraph("Team Structure:", styles["heading"]))
+    story.append(Paragraph(f"<b>Project Name:</b> {escape(context['project_name'])}", styles["body"]))
+    if context.get("project_description"):
+        story.append(Paragraph(
+            f"<b>Project Description:</b> {escape(context['project_description'])}", styles["body"]
+        ))
+    story.append(Spacer(1, 2 * mm))
+
+    rows = [["Role", "Count", "Hours", "Rate/Hr", "Total Amount"]]
+    rows += [
+        [Paragraph(escape(row["Role"]), styles["cell"]), row["Count"], row["Hours"],
+         _money(context, row["Margin"]), _money(context, row["Margin_Amount"])]
+        for row in context["roles_data"]
+    ]
+    story.append(_grid(rows, [0.54 * width, 0.08 * width, 0.08 * width, 0.12 * width, 0.18 * width]))
+
+    if context.get("milestone_data"):
+        story.append(Paragraph("Milestone Breakdown", styles["heading"]))
+        rows = [["Milestone Name", "Description", "Percentage %", "Amount"]]
+        rows += [
+            [Paragraph(escape(m["Name"]), styles["cell"]), Paragraph(escape(m["Description"] or "-"), styles["cell"]),
+             m["Percentage"], _money(context, m["Amount"])]
+            for m in context["milestone_data"]
+        ]
+        story.append(_grid(rows, [0.15 * width, 0.56 * width, 0.14 * width, 0.15 * width]))
+
+    totals = [
+        ["Total Resource Count", f"{context['total_manpower']:,.0f}"],
+        ["Total Project Duration", f"{context['total_project_hours']:,.0f} Hrs"],
+        *([["Exchange Rate", context["exchange_rate"]]] if context.get("exchange_rate") else []),
+        ["Total Internal Cost", _money(context, context["total_internal"])],
+        ["Total Internal Cost + Total Overhead", _money(context, context["total_final"])],
+        ["Total Margin Cost", _money(context, context["total_margin"])],
+        ["Offered Discount", f"{context['discount_pct']:,.0f}%"],
+        ["Discounted Amount", _money(context, context["discount_amount"])],
+        ["Total Project Amount", _money(context, context["final_after_discount"])],
+    ]
+    table = Table(totals, colWidths=[85 * mm, 45 * mm], hAlign="LEFT")
+    table.setStyle(TableStyle([
+        ("FONT", (0, 0), (-1, -1), FONT_NAME, 8),
+        ("GRID", (0, 0), (-1, -1), 0.75, colors.HexColor("#333333")),
+        ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+        ("FONTSIZE", (0, -1), (0, -1), 9),
+        ("FONTSIZE", (1, -1), (1, -1), 12),
+        ("TEXTCOLOR", (1, -1), (1, -1), TOTAL_GREEN),
+        ("LINEABOVE", (0, -1), (-1, -1), 1, colors.HexColor("#333333")),
+        ("TOPPADDING", (0, -1), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, -1), (-1, -1), 5),
+    ]))
+    story += [Spacer(1, 3 * mm), table, Spacer(1, 3 * mm)]
+
+    story += _uploaded_documents(context, styles, "Uploaded Documents:")
+    return _build(story)
+
+
+RENDERERS = {
+    INTERNAL_TEMPLATE: render_internal_report,
+    CLIENT_TEMPLATE: render_client_report,
+}
@@ -0,0 +1,206 @@
+import math
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from fx import BASE_CURRENCY
+from money import split_milestones
+from pricing import CLIENT_TYPES, DEFAULT_MARGIN_PCT, DEFAULT_OVERHEAD_FACTOR, fx_rate_for, price_items
+from startup import timed_import
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+LOGO_PATH = os.path.join(TEMPLATES_DIR, "ormae_logo.png")
+HOURS_PER_DAY = 8
+TEMPLATE_CACHE_DIR = os.environ.get(
+    "TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "quotation-calculator-jinja")
+)
+
+INTERNAL_TEMPLATE = "internal_report.html"
+CLIENT_TEMPLATE = "client_report.html"
+# Report kind -> (template, title)
+REPORTS = {
+    "internal": (INTERNAL_TEMPLATE, "Internal Quotation"),
+    "client": (CLIENT_TEMPLATE, "Client Quotation"),
+}
+REPORT_BACKENDS = ("pisa", "reportlab")
+
+_template_env = None
+_template_env_lock = threading.Lock()
+
+
+def get_template_env():
+    # One environment per process. Compiled templates are kept in memory and
+    # reloaded only when the file's mtime changes; the bytecode cache lets
+    # fresh processes skip compiling them again. Jinja is imported on first
+    # use, like the rest of the PDF stack, to keep it off the cold start.
+    global _template_env
+    with _template_env_lock:
+        if _template_env is None:
+            jinja2 = timed_import("jinja2")
+            os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+            _template_env = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+                bytecode_cache=jinja2.FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+                auto_reload=True
+            )
+        return _template_env
+
+
+def warm_templates():
+    # Load both report templates up front so the first render does not pay for it
+    env = get_template_env()
+    for name in (INTERNAL_TEMPLATE, CLIENT_TEMPLATE):
+        env.get_template(name)
+    return env
+
+
+def generate_pdf_from_html(template_html: str):
+    # xhtml2pdf takes over half a second to import, so it is loaded on the
+    # first render (or by startup.prewarm) rather than with this module
+    pisa = timed_import("xhtml2pdf.pisa")
+    assets = timed_import("assets")
+    assets.register_fonts()
+    pdf_buffer = BytesIO()
+    pisa_status = pisa.CreatePDF(
+        src=template_html,
+        dest=pdf_buffer,
+        encoding="UTF-8",
+        link_callback=assets.link_callback
+    )
+
+    if pisa_status.err:
+        return None
+
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+
+def render_report(template_name: str, context: dict, backend: str = "pisa"):
+    """Render ``template_name`` with ``context`` and return the PDF bytes, or None on failure.
+
+    ``backend`` is "pisa" (HTML template laid out by xhtml2pdf) or
+    "reportlab" (the same report drawn directly, see reportlab_backend).
+    """
+    return render_report_timed(template_name, context, backend)[0]
+
+
+def render_report_timed(template_name: str, context: dict, backend: str = "pisa"):
+    """Like ``render_report``, but returns ``(pdf_bytes, timings)``.
+
+    ``timings`` holds the seconds spent rendering the HTML template
+    ("render_html") and laying out the PDF ("layout").
+    """
+    started = time.perf_counter()
+    if backend == "reportlab":
+        # Imported here so pisa-only processes never load it
+        reportlab_backend = timed_import("reportlab_backend")
+        pdf_bytes = reportlab_backend.RENDERERS[template_name](context)
+        return pdf_bytes, {"render_html": 0.0, "layout": time.perf_counter() - started}
+    if backend != "pisa":
+        raise ValueError(f"Unknown report backend: {backend}")
+
+    html = get_template_env().get_template(template_name).render(**context)
+    rendered = time.perf_counter()
+    pdf_buffer = generate_pdf_from_html(html)
+    timings = {"render_html": rendered - started, "layout": time.perf_counter() - rendered}
+    return (pdf_buffer.getvalue() if pdf_buffer else None), timings
+
+
+def definition_fx_rate(definition: dict) -> float:
+    # A definition may pin its exchange rate; otherwise the current one applies
+    if definition.get("fx_rate"):
+        return float(definition["fx_rate"])
+    return fx_rate_for(definition.get("client_type", "IND"))
+
+
+def price_definition(definition: dict, fx_rate: float = None):
+    items = definition.get("roles", [])
+    return price_items(
+        [item.get("role") for item in items],
+        [int(item.get("count", 0)) for item in items],
+        [int(item.get("hours", 0)) for item in items],
+        overhead_factor=float(definition.get("overhead_factor", DEFAULT_OVERHEAD_FACTOR)),
+        margin_pct=float(definition.get("margin_pct", DEFAULT_MARGIN_PCT)),
+        discount_pct=float(definition.get("discount_pct", 0)),
+        client_type=definition.get("client_type", "IND"),
+        fx_rate=definition_fx_rate(definition) if fx_rate is None else fx_rate
+    )
+
+
+def build_report_contexts(definition: dict, generated_on: str, quote=None):
+    """Build the (internal, client) template contexts for a quote definition.
+
+    A quote definition is a plain dict: project_name, project_description,
+    client_type, overhead_factor, margin_pct, discount_pct, roles (a list of
+    {role, count, hours}), milestones (a list of {name, desc, pct}), the
+    user_doc/functional_doc metadata and optionally fx_rate, the rupees per
+    unit of the client's currency. ``quote`` may pass an already computed
+    pricing result for the same definition.
+    """
+    items = definition.get("roles", [])
+    fx_rate = definition_fx_rate(definition)
+    if quote is None:
+        quote = price_definition(definition, fx_rate)
+    currency = CLIENT_TYPES[definition.get("client_type", "IND")]["currency"]
+
+    roles_data = []
+    total_project_hours = 0
+    total_manpower = 0
+
+    for idx, item in enumerate(items):
+        if item.get("role"):
+            count = int(item.get("count", 0))
+            hours = int(item.get("hours", 0))
+
+            total_project_hours += int(quote.total_hours[idx])
+            total_manpower += count
+
+            roles_data.append({
+                "Role": item["role"],
+                "Count": count,
+                "Hours": hours,
+                "Margin": float(quote.margin[idx]),
+                "Margin_Amount": float(quote.margin_amount[idx])
+            })
+
+    milestones = definition.get("milestones") or []
+    milestone_amounts = split_milestones(quote.final_after_discount, [m["pct"] for m in milestones])
+    milestone_data = [
+        {
+            "Name": m["name"],
+            "Description": m.get("desc", ""),
+            "Percentage": m["pct"],
+            "Amount": amount
+        }
+        for m, amount in zip(milestones, milestone_amounts)
+    ]
+
+    client_context = dict(
+        logo_path=LOGO_PATH,
+        project_name=definition.get("project_name", ""),
+        project_description=definition.get("project_description", ""),
+        total_project_hours=total_project_hours,
+        total_project_days=math.ceil(total_project_hours / HOURS_PER_DAY),
+        total_margin=quote.total_margin,
+        discount_pct=definition.get("discount_pct", 0),
+        discount_amount=quote.discount_amount,
+        final_after_discount=quote.final_after_discount,
+        total_manpower=total_manpower,
+        roles_data=roles_data,
+        milestone_data=milestone_data,
+        currency_symbol=CLIENT_TYPES[definition.get("client_type", "IND")]["currency_symbol"],
+        # The rate the quote was priced at, printed on both reports
+        exchange_rate=f"1 {currency} = ₹{fx_rate:,g}" if currency != BASE_CURRENCY else None,
+        user_doc=definition.get("user_doc"),
+        functional_doc=definition.get("functional_doc")
+    )
+    internal_context = dict(
+        client_context,
+        generated_on=generated_on,
+        total_internal=quote.total_internal,
+        total_final=quote.total_final
+    )
+    return internal_context, client_context
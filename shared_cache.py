@@ -0,0 +1,227 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def sizeof(value) -> int:
+    # Bytes held by a cached value, close enough for budgeting
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class SharedCache:
+    """Process-wide LRU cache of large computed objects, shared by all sessions.
+
+    Entries are keyed by content, so sessions asking for the same report or
+    pricing grid share one copy. Each entry is held by the sessions that
+    stored or read it, and a session's memory is the size of the entries it
+    holds. A session over ``per_session_bytes`` lets go of its least recently
+    used entries, and a session idle for ``idle_seconds`` lets go of all of
+    them. Once the cache is over ``max_bytes`` or ``max_entries``, entries no
+    session holds are evicted first, then the least recently used ones.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, per_session_bytes: int = 32 * 1024 * 1024,
+                 idle_seconds: float = 1800, max_entries: int = 1024):
+        self.max_bytes = max_bytes
+        self.per_session_bytes = per_session_bytes
+        self.idle_seconds = idle_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> [value, size, set of holding sessions]
+        self._entries = OrderedDict()
+        # session -> {"keys": OrderedDict of held keys, "bytes": ..., "last_seen": ...}
+        self._sessions = {}
+        self._bytes = 0
+        self._next_idle_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_bytes=int(float(os.environ.get("CACHE_MAX_MB", 256)) * 1024 * 1024),
+            per_session_bytes=int(float(os.environ.get("SESSION_CACHE_MAX_MB", 32)) * 1024 * 1024),
+            idle_seconds=float(os.environ.get("SESSION_IDLE_MINUTES", 30)) * 60
+        )
+
+    def __contains__(self, key: str) -> bool:
+        # Membership checks do not count as lookups or refresh recency
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: str, session: str = None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            if session is not None:
+                self._hold(key, session)
+            return entry[0]
+
+    def hold(self, key: str, session: str) -> bool:
+        """Mark ``key`` as in use by ``session`` without counting a lookup.
+
+        Returns whether the key is cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._hold(key, session)
+            return True
+
+    def put(self, key: str, value, size: int = None, session: str = None):
+        size = sizeof(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            holders = set()
+            if old is not None:
+                holders = old[2]
+                self._bytes -= old[1]
+                for holder in holders:
+                    self._sessions[holder]["bytes"] += size - old[1]
+            self._entries[key] = [value, size, holders]
+            self._bytes += size
+            if session is not None:
+                self._hold(key, session)
+            self._evict()
+
+    def get_or_compute(self, key: str, compute, session: str = None):
+        """Return the cached value of ``key``, storing ``compute()`` on a miss.
+
+        A None result is returned but not cached.
+        """
+        value = self.get(key, session)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value, session=session)
+        return value
+
+    def touch(self, session: str):
+        """Mark a session as active; sessions idle for too long are released here."""
+        now = time.monotonic()
+        with self._lock:
+            self._session(session)["last_seen"] = now
+            if now < self._next_idle_check:
+                return
+            self._next_idle_check = now + min(self.idle_seconds, 60)
+            for idle in [s for s, info in self._sessions.items() if now - info["last_seen"] > self.idle_seconds]:
+                self._release(idle, drop_unheld=True)
+
+    def release(self, session: str):
+        """Let go of everything a session holds, e.g. when it ends."""
+        with self._lock:
+            self._release(session, drop_unheld=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sessions.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "unheld_entries": sum(not holders for _, _, holders in self._entries.values()),
+                "sessions": len(self._sessions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def session_stats(self) -> list:
+        """Memory held by each session, largest first."""
+        now = time.monotonic()
+        with self._lock:
+            sessions = [
+                {
+                    "session": session,
+                    "entries": len(info["keys"]),
+                    "bytes": info["bytes"],
+                    "shared_bytes": sum(
+                        self._entries[key][1] for key in info["keys"] if len(self._entries[key][2]) > 1
+                    ),
+                    "idle_seconds": round(now - info["last_seen"]),
+                }
+                for session, info in self._sessions.items()
+            ]
+        return sorted(sessions, key=lambda s: s["bytes"], reverse=True)
+
+    def _session(self, session: str) -> dict:
+        info = self._sessions.get(session)
+        if info is None:
+            info = self._sessions[session] = {"keys": OrderedDict(), "bytes": 0, "last_seen": time.monotonic()}
+        return info
+
+    def _hold(self, key: str, session: str):
+        info = self._session(session)
+        info["last_seen"] = time.monotonic()
+        entry = self._entries[key]
+        if session not in entry[2]:
+            entry[2].add(session)
+            info["bytes"] += entry[1]
+        info["keys"][key] = None
+        info["keys"].move_to_end(key)
+        # Over its cap, the session lets go of its oldest entries, which
+        # other sessions may still hold and which stay cached until evicted
+        while info["bytes"] > self.per_session_bytes and len(info["keys"]) > 1:
+            oldest = next(iter(info["keys"]))
+            self._unhold(oldest, session)
+
+    def _unhold(self, key: str, session: str):
+        info = self._sessions[session]
+        del info["keys"][key]
+        entry = self._entries[key]
+        entry[2].discard(session)
+        info["bytes"] -= entry[1]
+
+    def _release(self, session: str, drop_unheld: bool):
+        info = self._sessions.pop(session, None)
+        if info is None:
+            return
+        for key in info["keys"]:
+            entry = self._entries[key]
+            entry[2].discard(session)
+            if drop_unheld and not entry[2]:
+                self._drop(key)
+
+    def _drop(self, key: str):
+        value, size, holders = self._entries.pop(key)
+        self._bytes -= size
+        self.evictions += 1
+        for holder in holders:
+            info = self._sessions[holder]
+            del info["keys"][key]
+            info["bytes"] -= size
+
+    def _evict(self):
+        def over() -> bool:
+            return self._bytes > self.max_bytes or len(self._entries) > self.max_entries
+
+        if not over():
+            return
+        for key in [key for key, (_, _, holders) in self._entries.items() if not holders]:
+            self._drop(key)
+            if not over():
+                return
+        while over():
+            self._drop(next(iter(self._entries)))
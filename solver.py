@@ -0,0 +1,187 @@
+"""Work a quote backwards from a target price.
+
+Given the amount the client should pay, the solver looks for team mixes,
+margins and discounts that hit it. Pricing is linear in person-hours: a
+team whose cost with overhead is C is quoted at C / (1 - margin%) and then
+discounted, so every margin/discount pair is a fixed factor on C. The
+solver runs a dynamic program over that cost, one role at a time and
+vectorized across all costs. For every reachable cost it keeps the team
+with the most person-hours. All candidate teams are then scored against
+every margin/discount pair at once. The chosen candidates are priced with
+``price_items``, so their figures are exactly what the calculator shows.
+
+    candidates = solve(1_000_000, {"Data Engineer": RoleBounds(0, 3, 40, 800), ...})
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from pricing import DEFAULT_OVERHEAD_FACTOR, MARGIN_OPTIONS, QuoteResult, fx_rate_for, price_items, rate_table
+from rate_card import current_roles
+
+OBJECTIVES = ("margin", "hours")
+
+# Cost buckets per tolerance band, and a cap for very tight tolerances
+BUCKETS_PER_TOLERANCE = 16
+MAX_BUCKETS = 2_000_000
+
+
+class RoleBounds(NamedTuple):
+    min_count: int = 0
+    max_count: int = 0
+    min_hours: int = 0
+    max_hours: int = 0
+
+
+class Candidate(NamedTuple):
+    """A team ({role, count, hours} rows) with its margin, discount and price.
+
+    ``gap`` is the quoted amount minus the target.
+    """
+
+    roles: list
+    margin_pct: int
+    discount_pct: int
+    quote: QuoteResult
+    gap: float
+    feasible: bool
+
+
+def role_options(bounds: RoleBounds, hour_step: int) -> dict:
+    """Distinct person-hour totals a role can take, each with the (count, hours)
+    that gives it with the fewest people."""
+    options = {0: (0, 0)} if bounds.min_count <= 0 else {}
+    hours = range(max(bounds.min_hours, 0), bounds.max_hours + 1, hour_step)
+    for count in range(max(bounds.min_count, 1), bounds.max_count + 1):
+        for hour in hours:
+            options.setdefault(count * hour, (count, hour))
+    return dict(sorted(options.items()))
+
+
+def solve(target: float, bounds: dict, client_type: str = "IND", overhead_factor: float = DEFAULT_OVERHEAD_FACTOR,
+          min_margin: float = 0, max_margin: float = 100, max_discount: int = 0, hour_step: int = 40,
+          top_n: int = 5, objective: str = "margin", tolerance_pct: float = 0.5, role_master: dict = None,
+          fx_rate: float = None) -> list:
+    """Top ``top_n`` candidates for a ``final_after_discount`` of ``target``.
+
+    ``bounds`` maps roles to their RoleBounds; hours go in steps of
+    ``hour_step``. Margins are the calculator's MARGIN_OPTIONS within
+    [min_margin, max_margin] and discounts whole percentages up to
+    ``max_discount``, at most 99. A candidate is feasible within
+    ``tolerance_pct`` of the target and takes the highest margin, then the
+    lowest discount, that makes it so. Feasible candidates are ranked by those terms and then closeness
+    to the target ("margin"), or by total person-hours first ("hours").
+    Candidates quoting the same amount are only listed once. When none is
+    feasible, the closest teams not above the cost ceiling are returned.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {', '.join(OBJECTIVES)}")
+    if target <= 0 or tolerance_pct <= 0 or hour_step <= 0:
+        raise ValueError("target, tolerance_pct and hour_step must be positive")
+    margins = np.array([m for m in MARGIN_OPTIONS if min_margin <= m <= max_margin], dtype=np.float64)
+    if not len(margins):
+        raise ValueError(f"No margin option between {min_margin}% and {max_margin}%")
+    if not 0 <= max_discount <= 100:
+        raise ValueError("max_discount must be between 0 and 100")
+    # A 100% discount quotes every team at zero, so it can never meet a target
+    discounts = np.arange(min(int(max_discount), 99) + 1, dtype=np.float64)
+
+    role_master = current_roles() if role_master is None else role_master
+    fx_rate = fx_rate_for(client_type) if fx_rate is None else fx_rate
+    rates = rate_table(role_master, client_type, overhead_factor, fx_rate)
+
+    # Quoted amount of a team per unit of its cost, for every margin/discount pair
+    factors = ((1 - discounts[None, :] / 100) / (1 - margins[:, None] / 100)).ravel()
+    tolerance = target * tolerance_pct / 100
+    resolution = tolerance / factors.max() / BUCKETS_PER_TOLERANCE
+    max_cost = (target + tolerance) / factors.min()
+    resolution = max(resolution, max_cost / MAX_BUCKETS)
+    size = int(max_cost / resolution) + 1
+
+    # best_hours[b] is the most person-hours of any team in cost bucket b
+    # seen so far, cost[b] that team's exact cost
+    best_hours = np.full(size, -np.inf)
+    best_hours[0] = 0
+    cost = np.zeros(size)
+    steps = []
+    for role, role_bounds in bounds.items():
+        if role not in rates.index:
+            raise ValueError(f"Unknown role: {role}")
+        options = role_options(RoleBounds(*role_bounds), hour_step)
+        if not options:
+            raise ValueError(f"No count and hours of {role} lie within its bounds")
+        if list(options) == [0]:
+            continue
+        person_hours = np.array(list(options), dtype=np.float64)
+        option_costs = person_hours * rates.overhead[rates.index[role]]
+        shifts = np.rint(option_costs / resolution).astype(np.int64)
+
+        new_hours = np.full(size, -np.inf)
+        new_cost = np.zeros(size)
+        choice = np.full(size, -1, dtype=np.int32)
+        for k, shift in enumerate(shifts):
+            if shift >= size:
+                break
+            candidates = best_hours[:size - shift] + person_hours[k]
+            better = candidates > new_hours[shift:]
+            new_hours[shift:][better] = candidates[better]
+            new_cost[shift:][better] = cost[:size - shift][better] + option_costs[k]
+            choice[shift:][better] = k
+        best_hours, cost = new_hours, new_cost
+        steps.append((role, list(options.values()), shifts, choice))
+
+    reachable = np.flatnonzero(best_hours > -np.inf)
+    finals = cost[reachable, None] * factors[None, :]
+    gaps = np.abs(finals - target)
+    feasible = (gaps <= tolerance) & (finals > 0)
+    rows = np.arange(len(reachable))
+    hours = best_hours[reachable]
+
+    if feasible.any():
+        # Each team takes its best feasible terms: the highest margin, then the lowest discount
+        terms = (margins[:, None] * 1000 - discounts[None, :]).ravel()
+        pairs = np.where(feasible, terms, -np.inf).argmax(axis=1)
+        team_terms, team_gaps = terms[pairs], gaps[rows, pairs]
+        if objective == "margin":
+            order = np.lexsort((-hours, team_gaps, -team_terms))
+        else:
+            order = np.lexsort((team_gaps, -team_terms, -hours))
+        order = order[feasible[rows, pairs][order]]
+    else:
+        pairs = gaps.argmin(axis=1)
+        order = np.lexsort((-hours, gaps[rows, pairs]))
+
+    # Different teams often cost the same; only the first of each price is kept
+    _, first = np.unique(np.round(finals[order, pairs[order]], 2), return_index=True)
+    order = order[np.sort(first)]
+
+    results = []
+    for i in order[:top_n]:
+        margin_pct = int(margins[pairs[i] // len(discounts)])
+        discount_pct = int(discounts[pairs[i] % len(discounts)])
+        team = _backtrack(steps, reachable[i])
+        quote = price_items(
+            [row["role"] for row in team],
+            [row["count"] for row in team],
+            [row["hours"] for row in team],
+            overhead_factor=overhead_factor,
+            margin_pct=margin_pct,
+            discount_pct=discount_pct,
+            client_type=client_type,
+            role_master=role_master,
+            fx_rate=fx_rate
+        )
+        gap = quote.final_after_discount - target
+        results.append(Candidate(team, margin_pct, discount_pct, quote, gap, abs(gap) <= tolerance))
+    return results
+
+
+def _backtrack(steps: list, bucket: int) -> list:
+    team = []
+    for role, options, shifts, choice in reversed(steps):
+        k = choice[bucket]
+        count, hours = options[k]
+        if count:
+            team.append({"role": role, "count": count, "hours": hours})
+        bucket -= shifts[k]
+    return team[::-1]
@@ -0,0 +1,130 @@
+"""Cold-start timing and background pre-warming.
+
+The PDF stack (xhtml2pdf, reportlab, pypdf, Jinja) is imported on first use
+through ``timed_import``, so the first page is drawn without it. The time of
+each such import is recorded and shown by ``startup_report``. ``prewarm``
+does the expensive first-use work up front: it imports pisa, registers the
+NotoSans font and compiles both report templates. ``start_prewarm`` runs it
+on a background thread once per process unless ``PREWARM=0``.
+
+Run as a script to see what every top-level import costs a fresh interpreter:
+
+    python startup.py
+    python startup.py xhtml2pdf.pisa reportlab
+"""
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# What app.py and the report renderers import, in the order they need it
+APP_MODULES = (
+    "numpy", "pandas", "streamlit", "altair", "jinja2", "reportlab", "xhtml2pdf.pisa", "pypdf", "PIL.Image",
+)
+
+_lock = threading.Lock()
+_imports = {}
+_prewarm = {"state": "not started", "stages": {}}
+_prewarm_thread = None
+
+
+def timed_import(name: str):
+    """Import module ``name``, recording how long the first import took.
+
+    Always goes through importlib, which waits for a module another thread
+    (e.g. the pre-warm) is still importing instead of returning it half-built.
+    """
+    loaded = name in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    if not loaded:
+        with _lock:
+            _imports.setdefault(name, time.perf_counter() - started)
+    return module
+
+
+def prewarm():
+    # Imported here so that importing this module stays cheap
+    from assets import register_fonts
+    from reports import warm_templates
+
+    _prewarm["state"] = "running"
+    # The import itself is recorded with the other lazy imports
+    timed_import("xhtml2pdf.pisa")
+    stages = [("register_fonts", register_fonts), ("compile_templates", warm_templates)]
+    for stage, run in stages:
+        started = time.perf_counter()
+        run()
+        _prewarm["stages"][stage] = time.perf_counter() - started
+    _prewarm["state"] = "done"
+
+
+def _run_prewarm():
+    try:
+        prewarm()
+    except Exception as e:
+        # A failed warm-up only means the first report pays for it instead
+        _prewarm["state"] = f"failed: {e}"
+
+
+def start_prewarm():
+    """Start ``prewarm`` on a background thread, once per process.
+
+    Returns the thread, or None when ``PREWARM=0``.
+    """
+    global _prewarm_thread
+    if os.environ.get("PREWARM", "1") == "0":
+        _prewarm["state"] = "disabled"
+        return None
+    with _lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=_run_prewarm, name="prewarm", daemon=True)
+            _prewarm_thread.start()
+        return _prewarm_thread
+
+
+def startup_report() -> dict:
+    """Seconds spent in each lazy import and pre-warm stage of this process."""
+    with _lock:
+        imports = dict(sorted(_imports.items(), key=lambda item: item[1], reverse=True))
+    return {"imports": imports, "prewarm": _prewarm["state"], "prewarm_stages": dict(_prewarm["stages"])}
+
+
+def import_times(modules=APP_MODULES) -> list:
+    """(module, seconds) for each of ``modules`` imported in order by a fresh
+    interpreter. A module's time excludes what earlier modules already loaded."""
+    code = "\n".join(f"import {name}" for name in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nested imports are indented
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        times[name.strip()] = int(cumulative) / 1e6
+    report = []
+    for name in modules:
+        # Submodules such as xhtml2pdf.pisa are listed under their top-level package
+        top = name.split(".")[0]
+        seconds = sum(t for module, t in times.items() if module == name or module == top)
+        report.append((name, seconds))
+    return report
+
+
+def main(argv=None):
+    modules = (argv if argv is not None else sys.argv[1:]) or APP_MODULES
+    report = import_times(modules)
+    width = max(len(name) for name, _ in report)
+    for name, seconds in report:
+        print(f"{name:<{width}}  {seconds * 1000:8.1f} ms")
+    print(f"{'total':<{width}}  {sum(s for _, s in report) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
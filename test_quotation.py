@@ -0,0 +1,304 @@
+"""Invariants of the pricing core that the page, reports and API rely on.
+
+    python -m pytest -q
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from io import BytesIO
+
+import numpy as np
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from api import QuoteAPI, asgi_request
+from batch_quote import parse_csv_row, parse_records, price_all, read_scenarios
+from money import BASIS_POINTS, allocate, divide_half_even, percent_of, split_milestones, to_minor
+from pdf_attach import append_pdfs, is_pdf, pdf_readable
+from pricing import DEFAULT_OVERHEAD_FACTOR, price_grid, price_items
+from quote_model import QuoteModel
+from rate_card import current_roles
+from solver import OBJECTIVES, RoleBounds, solve
+from upload_store import UploadStore
+
+# A fixed role master and exchange rates, so the tests do not depend on the
+# rate card or the exchange-rate source
+ROLE_MASTER = {
+    "Data Engineer": {"comp": 1_200_000},
+    "Data Scientist": {"comp": 1_800_000},
+    "Project Manager": {"comp": 2_600_000},
+    "Analyst": {"comp": 750_000},
+    "Architect": {"comp": 3_300_000},
+}
+FX_RATES = {"IND": 1.0, "USA": 91.01}
+
+
+def random_team(rng: random.Random, size: int) -> list:
+    return [[rng.choice(["", *ROLE_MASTER]), rng.randint(0, 5), rng.randint(0, 900)] for _ in range(size)]
+
+
+@pytest.mark.parametrize("client_type", list(FX_RATES))
+def test_quote_model_matches_price_items_under_random_edits(client_type):
+    rng = random.Random(7)
+    model = QuoteModel()
+    team = random_team(rng, 30)
+    for _ in range(2000):
+        action = rng.random()
+        if action < 0.1:
+            team.append(random_team(rng, 1)[0])
+        elif action < 0.2 and len(team) > 1:
+            team.pop(rng.randrange(len(team)))
+        else:
+            row = rng.choice(team)
+            column = rng.randrange(3)
+            row[column] = random_team(rng, 1)[0][column]
+        roles, counts, hours = (list(column) for column in zip(*team))
+        discount_pct = rng.choice([0, 5, 12.5])
+        quote = model.update(roles, counts, hours, 1.4, 30, discount_pct, client_type, ROLE_MASTER, FX_RATES[client_type])
+
+    fresh = price_items(roles, counts, hours, 1.4, 30, discount_pct, client_type, ROLE_MASTER, FX_RATES[client_type])
+    assert quote[8:] == fresh[8:]
+    for field in range(8):
+        assert (quote[field] == fresh[field]).all()
+
+
+def test_quote_model_reprices_everything_on_a_new_role_master():
+    model = QuoteModel()
+    model.update(["Data Engineer"], [1], [100], 1.4, 30, 0, "IND", ROLE_MASTER, 1.0)
+    reloaded = {**ROLE_MASTER, "Data Engineer": {"comp": 2_400_000}}
+    quote = model.update(["Data Engineer"], [1], [100], 1.4, 30, 0, "IND", reloaded, 1.0)
+    assert model.last_repriced == 1
+    assert quote.total_margin == price_items(["Data Engineer"], [1], [100], 1.4, 30, 0, "IND", reloaded, 1.0).total_margin
+
+
+def api_request(method, path, body=None, headers=None):
+    # A fresh app per request; its render pool only starts on a render
+    return asyncio.run(asgi_request(QuoteAPI(), method, path, body, headers))
+
+
+@pytest.fixture
+def definition():
+    role = next(iter(current_roles()))
+    return {
+        "project_name": "Test",
+        "client_type": "USA",
+        "fx_rate": 91.01,
+        "margin_pct": 30,
+        "discount_pct": 5,
+        "roles": [{"role": role, "count": 2, "hours": 160}],
+        "milestones": [{"name": "Kick-off", "pct": 30}, {"name": "Delivery", "pct": 70}],
+    }
+
+
+def test_api_quote_is_cached_by_etag(definition):
+    status, headers, payload = api_request("POST", "/quote", definition)
+    assert status == 200
+    quote = json.loads(payload)
+    assert quote["fx_rate"] == 91.01
+    assert sum(m["amount"] for m in quote["milestones"]) == round(quote["totals"]["final_after_discount"])
+
+    status, _, payload = api_request("POST", "/quote", definition, {"If-None-Match": headers["etag"]})
+    assert (status, payload) == (304, b"")
+    status, _, _ = api_request("POST", "/quote", {**definition, "discount_pct": 6}, {"If-None-Match": headers["etag"]})
+    assert status == 200
+
+
+def test_api_report_answers_if_none_match_before_rendering(definition):
+    status, _, payload = api_request("POST", "/reports/client", definition, {"If-None-Match": "*"})
+    assert (status, payload) == (304, b"")
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/quote", b"{not json"),
+    ("/quote", []),
+    ("/quote", {"client_type": "XX"}),
+    ("/quote", {"margin_pct": 100}),
+    ("/quote", {"fx_rate": 0}),
+    ("/quote", {"roles": [{"role": "Wizard", "count": 1, "hours": 1}]}),
+    ("/quote", {"roles": [{"role": "", "count": -1, "hours": 1}]}),
+    ("/quote", {"milestones": [{"name": "Kick-off", "pct": "30"}]}),
+    ("/reports/client?backend=word", {}),
+])
+def test_api_rejects_bad_requests(path, body):
+    status, _, payload = api_request("POST", path, body)
+    assert status == 400
+    assert json.loads(payload)["error"]
+
+
+def test_api_unknown_route():
+    assert api_request("GET", "/nope")[0] == 404
+
+
+SOLVER_BOUNDS = {
+    "Data Engineer": RoleBounds(0, 3, 40, 800),
+    "Data Scientist": RoleBounds(1, 2, 40, 400),
+    "Project Manager": RoleBounds(0, 1, 40, 200),
+}
+
+
+def solve_for(target, **kwargs):
+    return solve(target, SOLVER_BOUNDS, client_type="IND", role_master=ROLE_MASTER, fx_rate=1.0, **kwargs)
+
+
+@pytest.mark.parametrize("objective", OBJECTIVES)
+def test_solver_candidates_are_priced_and_within_bounds(objective):
+    candidates = solve_for(1_500_000, max_discount=10, objective=objective)
+    assert candidates and all(c.feasible for c in candidates)
+    for c in candidates:
+        assert abs(c.gap) <= 1_500_000 * 0.5 / 100
+        quote = price_items([r["role"] for r in c.roles], [r["count"] for r in c.roles], [r["hours"] for r in c.roles],
+                            DEFAULT_OVERHEAD_FACTOR, c.margin_pct, c.discount_pct, "IND", ROLE_MASTER, 1.0)
+        assert quote.final_after_discount == c.quote.final_after_discount
+        for row in c.roles:
+            bounds = SOLVER_BOUNDS[row["role"]]
+            assert bounds.min_count <= row["count"] <= bounds.max_count
+            assert bounds.min_hours <= row["hours"] <= bounds.max_hours
+    if objective == "margin":
+        assert [c.margin_pct for c in candidates] == sorted((c.margin_pct for c in candidates), reverse=True)
+
+
+def test_solver_accepts_a_full_discount_range():
+    candidates = solve_for(1_500_000, max_discount=100)
+    assert candidates and all(c.discount_pct < 100 for c in candidates)
+
+
+def test_solver_returns_the_closest_teams_when_nothing_fits():
+    candidates = solve_for(100_000_000)
+    assert candidates and not any(c.feasible for c in candidates)
+    assert all(c.gap < 0 for c in candidates)
+
+
+@pytest.mark.parametrize("target, kwargs", [
+    (0, {}),
+    (-1, {}),
+    (1_000_000, {"tolerance_pct": 0}),
+    (1_000_000, {"hour_step": 0}),
+    (1_000_000, {"objective": "profit"}),
+    (1_000_000, {"max_discount": 101}),
+    (1_000_000, {"max_discount": -1}),
+    (1_000_000, {"min_margin": 91, "max_margin": 99}),
+])
+def test_solver_rejects_bad_arguments(target, kwargs):
+    with pytest.raises(ValueError):
+        solve_for(target, **kwargs)
+
+
+def test_solver_rejects_unknown_and_impossible_roles():
+    with pytest.raises(ValueError, match="Unknown role"):
+        solve(1_000_000, {"Wizard": RoleBounds(1, 1, 40, 40)}, role_master=ROLE_MASTER, fx_rate=1.0)
+    with pytest.raises(ValueError, match="within its bounds"):
+        solve(1_000_000, {"Analyst": RoleBounds(2, 1, 40, 40)}, role_master=ROLE_MASTER, fx_rate=1.0)
+
+
+def test_price_grid_matches_price_items_in_every_cell():
+    rng = random.Random(11)
+    roles, counts, hours = (list(column) for column in zip(*random_team(rng, 12)))
+    overheads, margins, discounts = [1.0, 1.4, 1.75], [0, 10, 30, 50, 99], [0, 2.5, 7, 33, 100]
+    grid = price_grid(roles, counts, hours, list(FX_RATES), overheads, margins, discounts, ROLE_MASTER, FX_RATES)
+    assert grid.final_after_discount.shape == (len(FX_RATES), len(overheads), len(margins), len(discounts))
+    for c, client_type in enumerate(FX_RATES):
+        for o, overhead in enumerate(overheads):
+            for m, margin in enumerate(margins):
+                for d, discount in enumerate(discounts):
+                    quote = price_items(roles, counts, hours, overhead, margin, discount, client_type, ROLE_MASTER,
+                                        FX_RATES[client_type])
+                    assert grid.total_internal[c] == quote.total_internal
+                    assert grid.total_final[c, o] == quote.total_final
+                    assert grid.total_margin[c, o, m] == quote.total_margin
+                    assert grid.final_after_discount[c, o, m, d] == quote.final_after_discount
+
+
+def test_allocate_sums_exactly_and_stays_within_a_unit():
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        weights = rng.integers(0, 5_000, size=rng.integers(1, 8))
+        totals = rng.integers(0, 10**9, size=20)
+        shares = allocate(totals, weights)
+        if weights.sum() == 0:
+            assert not shares.any()
+            continue
+        assert (shares.sum(axis=-1) == totals).all()
+        exact = totals[:, None] * weights / weights.sum()
+        assert (np.abs(shares - exact) < 1).all()
+
+
+def test_allocate_leaves_the_rest_of_the_denominator_unallocated():
+    shares = allocate(1_000, [2_500, 2_500], denominator=BASIS_POINTS)
+    assert shares.tolist() == [250, 250]
+
+
+@pytest.mark.parametrize("total, percentages, expected", [
+    (230769.23, [30, 30, 40], [69231, 69231, 92307]),
+    (100, [33.33, 33.33, 33.34], [33, 33, 34]),
+    (1000, [50, 25], [500, 250]),
+    # Above 100% each milestone is its own share of the total
+    (1000, [60, 60], [600, 600]),
+    (1000, [], []),
+])
+def test_split_milestones(total, percentages, expected):
+    assert split_milestones(total, percentages) == expected
+
+
+def test_split_milestones_sums_to_the_displayed_total():
+    rng = random.Random(5)
+    for _ in range(500):
+        cuts = sorted(rng.randint(0, 10_000) for _ in range(rng.randint(0, 6)))
+        percentages = [(b - a) / 100 for a, b in zip([0, *cuts], [*cuts, 10_000])]
+        total = rng.uniform(0, 10**8)
+        assert sum(split_milestones(total, percentages)) == round(total)
+
+
+def test_rounding_is_half_to_even():
+    assert [to_minor(x) for x in (0.125, 0.135, 2.5 / 100)] == [12, 14, 2]
+    assert to_minor(np.array([0.005, 0.015, 0.025])).tolist() == [0, 2, 2]
+    assert [int(divide_half_even(n, 10)) for n in (5, 15, 25, -5, -15)] == [0, 2, 2, 0, -2]
+    assert [int(percent_of(n, 50)) for n in (1, 3, 5)] == [0, 2, 2]
+    assert int(percent_of(10_000, 12.5)) == 1_250
+
+
+def test_batch_reports_bad_records_and_keeps_going(tmp_path):
+    role = next(iter(current_roles()))
+    path = tmp_path / "scenarios.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"project": "A", "fx_rate": 1, "roles": [{"role": role, "count": 1, "hours": 10}]}),
+        "not json",
+        "[1, 2]",
+        json.dumps({"project": "B", "fx_rate": 1, "margin_pct": 100}),
+        json.dumps({"project": "C", "fx_rate": 1, "overhead_factor": "nan"}),
+    ]))
+    rows = list(price_all(read_scenarios(str(path))))
+    assert rows[0]["error"] == "" and rows[0]["total_duration"] == 10
+    assert [bool(row["error"]) for row in rows] == [False, True, True, True, True]
+
+    (row,) = parse_records([{"roles": f"{role}-2-160"}], parse_csv_row, "row")
+    assert "Role:count:hours" in row["error"]
+
+
+def test_unreadable_pdf_uploads_are_not_attached(tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4\nnot really a pdf")
+    assert not pdf_readable(str(broken))
+    assert not is_pdf({"name": "broken.pdf", "readable": False})
+    assert is_pdf({"name": "spec.PDF"}) and not is_pdf({"name": "spec.docx"})
+
+    writer = PdfWriter()
+    writer.add_blank_page(200, 200)
+    report = BytesIO()
+    writer.write(report)
+    valid = tmp_path / "valid.pdf"
+    valid.write_bytes(report.getvalue())
+    assert pdf_readable(str(valid))
+    assert len(PdfReader(BytesIO(append_pdfs(report.getvalue(), [str(valid)]))).pages) == 2
+
+
+def test_upload_store_expires_files_without_new_uploads(tmp_path):
+    store = UploadStore(str(tmp_path), ttl=60, cleanup_interval=0)
+    doc = store.put(BytesIO(b"requirements"), "spec.docx")
+    kept = store.put(BytesIO(b"other"), "other.docx")
+    stale = time.time() - 120
+    os.utime(tmp_path / doc["sha256"], (stale, stale))
+    assert store.path(doc["sha256"]) is None
+    assert store.path(kept["sha256"]) is not None
+    assert store.stats() == {"files": 1, "bytes": 5}
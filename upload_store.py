@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadStore:
+    """Content-addressed on-disk store for uploaded documents.
+
+    Files are streamed to disk in chunks while being hashed and saved under
+    their SHA-256, so the same document uploaded twice is stored once. Files
+    not touched for ``ttl`` seconds are removed, and the oldest go first
+    whenever the store grows past ``max_total_bytes``. Cleanup runs on every
+    upload, and from ``path`` and ``stats`` at most every
+    ``cleanup_interval`` seconds, so expired files go even when nobody uploads.
+    """
+
+    def __init__(self, root: str, max_file_bytes: int = 25 * 1024 * 1024,
+                 max_total_bytes: int = 512 * 1024 * 1024, ttl: float = 24 * 3600,
+                 cleanup_interval: float = 600):
+        self.root = root
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self._lock = threading.Lock()
+        self._next_cleanup = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            root=os.environ.get("UPLOAD_DIR") or os.path.join(tempfile.gettempdir(), "quotation-calculator-uploads"),
+            max_file_bytes=int(float(os.environ.get("UPLOAD_MAX_MB", 25)) * 1024 * 1024),
+            max_total_bytes=int(float(os.environ.get("UPLOAD_STORE_MAX_MB", 512)) * 1024 * 1024),
+            ttl=float(os.environ.get("UPLOAD_TTL_HOURS", 24)) * 3600
+        )
+
+    def put(self, fileobj, name: str) -> dict:
+        """Spool a readable binary file object to the store and return its metadata."""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                fileobj.seek(0)
+                for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                    size += len(chunk)
+                    if size > self.max_file_bytes:
+                        raise UploadTooLarge(
+                            f"{name} is larger than the {self.max_file_bytes // (1024 * 1024)} MB upload limit"
+                        )
+                    digest.update(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            path = os.path.join(self.root, sha256)
+            with self._lock:
+                if os.path.exists(path):
+                    os.utime(path)
+                else:
+                    os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.cleanup()
+        return {"name": name, "size": size, "sha256": sha256}
+
+    def path(self, sha256: str):
+        """Path of a stored document, or None once it has expired."""
+        self._cleanup_if_due()
+        path = os.path.join(self.root, sha256)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _cleanup_if_due(self):
+        if time.monotonic() >= self._next_cleanup:
+            self.cleanup()
+
+    def cleanup(self):
+        now = time.time()
+        with self._lock:
+            self._next_cleanup = time.monotonic() + self.cleanup_interval
+            entries = []
+            for entry in os.scandir(self.root):
+                if not entry.is_file() or entry.name.endswith(".part"):
+                    continue
+                stat = entry.stat()
+                if now - stat.st_mtime > self.ttl:
+                    os.remove(entry.path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_total_bytes:
+                    break
+                os.remove(path)
+                total -= size
+
+    def stats(self) -> dict:
+        self._cleanup_if_due()
+        with self._lock:
+            sizes = [
+                entry.stat().st_size for entry in os.scandir(self.root)
+                if entry.is_file() and not entry.name.endswith(".part")
+            ]
+        return {"files": len(sizes), "bytes": sum(sizes)}